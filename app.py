@@ -1,12 +1,20 @@
 import os
+import re
+import time
+import hashlib
+import hmac
 import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, jsonify, request
+import orjson
+from flask import Flask, g, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 
 # Import our database access layers and utilities
-from data_access import EventsDatabase, ApplicationDatabase
+from data_access import EventsDatabase, ApplicationDatabase, dict_row_factory
+from response_cache import ResponseCache
 from utils import (
     get_events_db_path, 
     get_app_db_path, 
@@ -27,65 +35,555 @@ EVENTS_DB_PATH = get_events_db_path()
 APP_DB_PATH = get_app_db_path()
 API_PORT = int(os.getenv("API_PORT", "5000"))
 API_KEY = os.getenv("API_KEY", "")  # Authentication key for protected endpoints
+API_KEY_BYTES = API_KEY.encode()  # API key as bytes, for hmac.compare_digest
 REQUIRE_AUTH = os.getenv("REQUIRE_AUTH", "false").lower() == "true"  # Whether authentication is required
+CACHE_CONTROL = f"{'private' if REQUIRE_AUTH else 'public'}, max-age=5"  # Cache-Control for read endpoints
+RESPONSE_CACHE_SIZE = 256  # Max rendered responses kept in memory per worker
+REDIS_URL = os.getenv("REDIS_URL", "")  # Optional Redis shared by all workers for cached responses
+CORS_MAX_AGE = os.getenv("CORS_MAX_AGE", "86400")  # Seconds browsers may cache preflight responses
+MAX_PAGE_SIZE = 100  # Hard cap on rows returned by paginated endpoints
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", os.getenv("API_THREADS", "8")))  # Pooled connections per database, per worker
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds a request waits for a free pooled connection
+QUERY_THREADS = int(os.getenv("API_QUERY_THREADS", "4"))  # Threads for running independent queries concurrently
+POND_TYPE_PATTERN = re.compile(r'(0x)?[0-9a-fA-F]{64}')  # bytes32 pond identifier as hex
+ADDRESS_PATTERN = re.compile(r'0x[0-9a-f]{40}')  # Lowercased 20-byte account address
+LEADERBOARD_SORT_COLUMNS = frozenset(('total_points', 'toss_points', 'winner_points', 'referral_points'))
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes responses with orjson."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Keys stay sorted to match Flask's default output
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
-# Initialize databases
-events_db = EventsDatabase(EVENTS_DB_PATH)
-app_db = ApplicationDatabase(APP_DB_PATH)
+# Initialize databases (the API only reads; writes go through the referral system)
+events_db = EventsDatabase(EVENTS_DB_PATH, read_only=True, pool_size=DB_POOL_SIZE)
+app_db = ApplicationDatabase(APP_DB_PATH, read_only=True, pool_size=DB_POOL_SIZE)
 
 # Initialize referral system
 referral_system = ReferralSystem(APP_DB_PATH)
 
+# CORS headers added to every response
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-API-Key',
+    'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE'
+}
+
+# Thread pool for independent queries; each pool thread has its own connections
+_query_executor = ThreadPoolExecutor(max_workers=QUERY_THREADS, thread_name_prefix='query')
+
+# Cache of rendered responses, in memory and optionally in Redis
+_response_cache = ResponseCache(RESPONSE_CACHE_SIZE, REDIS_URL or None)
+
+# Last status rows read for /indexer/status, as (data version, events row, app row).
+# Replaced as a whole tuple, so concurrent readers never see a partial update.
+_status_rows = None
+
+# Last formatted wall-clock second, as (epoch second, ISO string); replaced as a whole tuple
+_now_iso_cache = (0, '')
+
+# Static SQL, kept at module level so every request reuses the same statement text
+SQL_EVENTS_STATUS = '''
+SELECT
+    state.last_block,
+    state.total_tosses as toss_count,
+    state.total_winners as winner_count,
+    (SELECT MAX(block_timestamp)
+     FROM (
+         SELECT MAX(block_timestamp) as block_timestamp FROM coin_tossed_events
+         UNION ALL
+         SELECT MAX(block_timestamp) as block_timestamp FROM lucky_winner_selected_events
+     )) as last_event_timestamp
+FROM (SELECT 1)
+LEFT JOIN indexer_state state ON state.id = 1
+'''
+
+SQL_APP_STATUS = '''
+SELECT
+    COALESCE(cs.user_count, 0) as user_count,
+    cs.id,
+    cs.last_processed_toss_id,
+    cs.last_processed_winner_id,
+    cs.last_run_timestamp
+FROM (SELECT 1)
+LEFT JOIN calculator_state cs ON cs.id = 1
+'''
+
+# Leaderboard page, columns named as in the response; the sort is filled in per
+# (column, order). Rows are taken past the (:after_value, :after_id) keyset, which
+# defaults to a bound before the first row, so the same statement serves both
+# cursor and offset paging. up.id is the tiebreaker and is stripped from entries.
+SQL_LEADERBOARD_PAGE = '''
+SELECT
+    up.id,
+    up.address,
+    up.total_points,
+    up.toss_points,
+    up.winner_points,
+    up.referral_points,
+    ur.referral_code,
+    COALESCE(r.referrals_count, 0) as referrals_count,
+    COALESCE(r.referrals_activated, 0) as referrals_activated,
+    COALESCE(us.total_tosses, 0) as total_tosses,
+    COALESCE(us.total_value_spent, '0') as total_value_spent,
+    COALESCE(us.total_wins, 0) as total_wins
+FROM user_points up
+LEFT JOIN user_referrals ur ON up.address = ur.address
+LEFT JOIN user_stats us ON up.address = us.address
+LEFT JOIN (
+    -- Referral counts in one grouped pass, limited to the referrers on this page
+    SELECT referrer_address, COUNT(*) as referrals_count, SUM(is_activated) as referrals_activated
+    FROM user_referrals
+    WHERE referrer_address IN (
+        SELECT address FROM user_points
+        WHERE ({column}, id) {seek} (:after_value, :after_id)
+        ORDER BY {column} {order}, id {order}
+        LIMIT :limit OFFSET :offset
+    )
+    GROUP BY referrer_address
+) r ON r.referrer_address = up.address
+WHERE (up.{column}, up.id) {seek} (:after_value, :after_id)
+ORDER BY up.{column} {order}, up.id {order}
+LIMIT :limit OFFSET :offset
+'''
+
+# Keyset comparison and the starting (value, id) bound for each sort order
+LEADERBOARD_SEEKS = {
+    'ASC': ('>', (-2**63, -2**63)),
+    'DESC': ('<', (2**63 - 1, 2**63 - 1))
+}
+
+# One fixed statement per (sort_by, order), built once so each stays in the statement cache
+SQL_LEADERBOARD_PAGES = {
+    (column, order): SQL_LEADERBOARD_PAGE.format(column=column, order=order, seek=LEADERBOARD_SEEKS[order][0])
+    for column in LEADERBOARD_SORT_COLUMNS
+    for order in ('ASC', 'DESC')
+}
+
+SQL_USER_APP_DATA = '''
+SELECT
+    up.address IS NOT NULL as has_points,
+    up.total_points,
+    up.toss_points,
+    up.winner_points,
+    up.referral_points,
+    ur.address IS NOT NULL as has_referral,
+    ur.referral_code,
+    referrer.referral_code as referrer_code,
+    (SELECT COUNT(*) FROM user_referrals WHERE referrer_address = u.address) as total_referrals,
+    (SELECT COALESCE(SUM(is_activated), 0) FROM user_referrals WHERE referrer_address = u.address) as active_referrals,
+    COALESCE(us.total_tosses, 0) as total_tosses,
+    COALESCE(us.total_value_spent, '0') as total_value_spent,
+    COALESCE(us.total_wins, 0) as total_wins
+FROM (SELECT ? as address) u
+LEFT JOIN user_points up ON up.address = u.address
+LEFT JOIN user_stats us ON us.address = u.address
+LEFT JOIN user_referrals ur ON ur.address = u.address
+LEFT JOIN user_referrals referrer ON referrer.address = ur.referrer_address
+'''
+
+SQL_TOTAL_TOSSES = 'SELECT COALESCE(MAX(total_tosses), 0) FROM indexer_state WHERE id = 1'
+
+SQL_TOTAL_WINNERS = 'SELECT COALESCE(MAX(total_winners), 0) FROM indexer_state WHERE id = 1'
+
+SQL_USER_COUNT = 'SELECT COALESCE(MAX(user_count), 0) FROM calculator_state WHERE id = 1'
+
+# Filtered list and count queries; {where} is filled in with a clause from
+# build_where_clause through filtered_sql
+SQL_WINNERS_PAGE = '''
+SELECT
+    tx_hash,
+    block_number,
+    strftime('%Y-%m-%dT%H:%M:%S', block_timestamp, 'unixepoch', 'localtime'),
+    pond_type,
+    winner_address,
+    prize,
+    selector,
+    token_address,
+    block_timestamp,
+    id
+FROM lucky_winner_selected_events
+WHERE {where}
+ORDER BY block_timestamp DESC, id DESC LIMIT ? OFFSET ?
+'''
+
+SQL_TOSSES_PAGE = '''
+SELECT
+    tx_hash,
+    block_number,
+    strftime('%Y-%m-%dT%H:%M:%S', block_timestamp, 'unixepoch', 'localtime'),
+    pond_type,
+    frog_address,
+    amount,
+    total_pond_tosses,
+    total_pond_value,
+    token_address,
+    block_timestamp,
+    id
+FROM coin_tossed_events
+WHERE {where}
+ORDER BY block_timestamp DESC, id DESC LIMIT ? OFFSET ?
+'''
+
+SQL_USER_TOSSES_PAGE = '''
+SELECT
+    id, tx_hash, block_number,
+    strftime('%Y-%m-%dT%H:%M:%S', block_timestamp, 'unixepoch', 'localtime'),
+    pond_type, amount, total_pond_tosses, total_pond_value, token_address,
+    block_timestamp, id
+FROM coin_tossed_events
+WHERE {where}
+ORDER BY block_timestamp DESC, id DESC LIMIT ? OFFSET ?
+'''
+
+SQL_USER_WINS_PAGE = '''
+SELECT
+    id, tx_hash, block_number,
+    strftime('%Y-%m-%dT%H:%M:%S', block_timestamp, 'unixepoch', 'localtime'),
+    pond_type, prize, selector, token_address,
+    block_timestamp, id
+FROM lucky_winner_selected_events
+WHERE {where}
+ORDER BY block_timestamp DESC, id DESC LIMIT ? OFFSET ?
+'''
+
+SQL_WINNERS_COUNT = 'SELECT COUNT(*) FROM lucky_winner_selected_events WHERE {where}'
+
+SQL_TOSSES_COUNT = 'SELECT COUNT(*) FROM coin_tossed_events WHERE {where}'
+
+# Response fields of each event list item, in the order the list queries select
+# them. Rows stay plain tuples and are zipped with these names; the queries add
+# block_timestamp and id after the item fields for the keyset cursor.
+WINNER_ITEM_COLUMNS = ('tx_hash', 'block_number', 'timestamp', 'pond_type', 'winner_address',
+                       'prize', 'selector', 'token_address')
+TOSS_ITEM_COLUMNS = ('tx_hash', 'block_number', 'timestamp', 'pond_type', 'frog_address',
+                     'amount', 'total_pond_tosses', 'total_pond_value', 'token_address')
+USER_TOSS_ITEM_COLUMNS = ('id', 'tx_hash', 'block_number', 'timestamp', 'pond_type',
+                          'amount', 'total_pond_tosses', 'total_pond_value', 'token_address')
+USER_WIN_ITEM_COLUMNS = ('id', 'tx_hash', 'block_number', 'timestamp', 'pond_type',
+                         'prize', 'selector', 'token_address')
+
+# Fixed-text queries prepared on every new connection before it serves requests
+events_db.warm_statements = [
+    (SQL_EVENTS_STATUS, ()),
+    (SQL_TOTAL_TOSSES, ()),
+    (SQL_TOTAL_WINNERS, ())
+]
+app_db.warm_statements = [
+    (SQL_APP_STATUS, ()),
+    (SQL_USER_APP_DATA, ('',)),
+    (SQL_USER_COUNT, ())
+] + [
+    (query, {'limit': 0, 'offset': 0, 'after_value': 0, 'after_id': 0})
+    for query in SQL_LEADERBOARD_PAGES.values()
+]
+
+def now_iso() -> str:
+    """Current local time as an ISO string, formatted at most once per second."""
+    global _now_iso_cache
+    second = int(time.time())
+    cached_second, formatted = _now_iso_cache
+    if second != cached_second:
+        formatted = datetime.fromtimestamp(second).isoformat()
+        _now_iso_cache = (second, formatted)
+    return formatted
+
+def json_response(obj: Any):
+    """
+    Build a JSON response with orjson straight to bytes, skipping the str
+    round-trip of jsonify. Output matches jsonify: sorted keys and a trailing newline.
+    """
+    body = orjson.dumps(obj, default=app.json.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    return app.response_class(body, mimetype='application/json')
+
+def stream_json_page(head: Dict[str, Any], list_key: str, cursor, limit: int,
+                     to_item: Callable, tail: Callable[[Any, bool], Dict[str, Any]]):
+    """
+    Stream a page of rows as a JSON object: the head fields, then list_key
+    holding up to limit items built by to_item, then the fields returned by
+    tail(last_row, has_more). The cursor should select limit + 1 rows; they are
+    read one at a time, so the page is never held in memory as a whole.
+    Errors raised once streaming has started abort the response.
+    """
+    def generate():
+        head_json = orjson.dumps(head, default=app.json.default, option=orjson.OPT_SORT_KEYS)
+        yield head_json[:-1] + (b',' if head else b'') + orjson.dumps(list_key) + b':['
+        
+        last_row = None
+        has_more = False
+        for count, row in enumerate(cursor):
+            if count == limit:
+                has_more = True
+                break
+            yield (b',' if count else b'') + orjson.dumps(to_item(row), default=app.json.default, option=orjson.OPT_SORT_KEYS)
+            last_row = row
+        
+        tail_json = orjson.dumps(tail(last_row, has_more), default=app.json.default, option=orjson.OPT_SORT_KEYS)
+        yield b']' + (b',' if len(tail_json) > 2 else b'') + tail_json[1:] + b'\n'
+    
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def get_cursor_args(first: str, second: str) -> Optional[tuple]:
+    """
+    Read a two-part integer cursor, such as before_ts/before_id, from the query
+    string, or None if absent. Raises ValueError if only one half is given or
+    either is not an integer.
+    """
+    first_value = request.args.get(first)
+    second_value = request.args.get(second)
+    if (first_value is None) != (second_value is None):
+        raise ValueError(f"{first} and {second} must be provided together")
+    if first_value is None:
+        return None
+    try:
+        return (int(first_value), int(second_value))
+    except ValueError:
+        raise ValueError(f"{first} and {second} must be integers")
+
+def get_keyset_cursor_args() -> Optional[tuple]:
+    """
+    Read the (before_ts, before_id) keyset cursor from the query string, or None
+    if absent. Raises ValueError if it is incomplete or malformed.
+    """
+    return get_cursor_args('before_ts', 'before_id')
+
+def keyset_page_tail(last_row, has_more: bool) -> Dict[str, Any]:
+    """
+    Trailing fields of a streamed keyset page: has_more and the cursor for the
+    next page, taken from the (block_timestamp, id) ending each row tuple.
+    """
+    next_cursor = None
+    if has_more:
+        next_cursor = {
+            "before_ts": last_row[-2],
+            "before_id": last_row[-1]
+        }
+    return {"has_more": has_more, "next_cursor": next_cursor}
+
+# Body of the 401 sent for a missing or wrong API key, serialized once
+INVALID_API_KEY_JSON = orjson.dumps({
+    "status": "error",
+    "message": "Unauthorized. Valid API key required."
+}, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
 def require_api_key(f):
-    """Decorator to require API key for protected endpoints."""
+    """
+    Decorator to require API key for protected endpoints. With authentication
+    disabled the endpoint is returned unwrapped.
+    """
+    if not REQUIRE_AUTH:
+        return f
+    
     @functools.wraps(f)
     def decorated(*args, **kwargs):
-        if not REQUIRE_AUTH:
-            return f(*args, **kwargs)
-            
+        # Constant-time compare, so response timing reveals nothing about the key
         api_key = request.headers.get('X-API-Key')
-        if api_key and api_key == API_KEY:
+        if api_key and hmac.compare_digest(api_key.encode(), API_KEY_BYTES):
             return f(*args, **kwargs)
         else:
-            return jsonify({
-                "status": "error",
-                "message": "Unauthorized. Valid API key required."
-            }), 401
+            return app.response_class(INVALID_API_KEY_JSON, status=401, mimetype='application/json')
+    return decorated
+
+def get_data_version() -> str:
+    """Get the version of the data behind both databases, computed once per request."""
+    if 'data_version' not in g:
+        g.data_version = f"{events_db.get_data_version()}|{app_db.get_data_version()}"
+    return g.data_version
+
+def conditional_response(f):
+    """
+    Decorator adding ETag and Cache-Control headers to a read endpoint.
+    The ETag is derived from the data version and the request path, so a
+    client holding a current copy gets a 304 without any query being run.
+    """
+    @functools.wraps(f)
+    def decorated(*args, **kwargs):
+        etag = hashlib.sha1(f"{get_data_version()}:{request.full_path}".encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
     return decorated
 
+def cached_response(ttl: int):
+    """
+    Decorator memoizing a read endpoint's successful responses for ttl seconds.
+    Entries are keyed on the request path and data version, so any database
+    write also invalidates them. If the endpoint fails, the last good response
+    for the same path is served instead of the error.
+    Cached endpoints must return bodies already built in memory: the body is
+    read whole to be stored, so a streamed one gains nothing. Should one fail
+    while its body is read, that is treated as a server error too.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated(*args, **kwargs):
+            key = f"{request.full_path}|{get_data_version()}"
+            cached = _response_cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return app.response_class(body, status=200, mimetype=mimetype)
+            
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                try:
+                    value = (response.get_data(), response.mimetype)
+                except Exception as e:
+                    logger.error(f"Error building response for {request.full_path}: {e}")
+                    response = json_response({
+                        "status": "error",
+                        "message": str(e),
+                        "timestamp": now_iso()
+                    })
+                    response.status_code = 500
+                else:
+                    _response_cache.set(key, value, ttl)
+                    _response_cache.set_stale(request.full_path, value)
+            if response.status_code >= 500:
+                stale = _response_cache.get_stale(request.full_path)
+                if stale is not None:
+                    logger.warning(f"Serving stale response for {request.full_path}")
+                    body, mimetype = stale
+                    return app.response_class(body, status=200, mimetype=mimetype)
+            return response
+        return decorated
+    return decorator
+
+def get_events_conn():
+    """Get the events database connection checked out from the pool for this request."""
+    if 'events_conn' not in g:
+        g.events_conn = events_db.acquire_connection(DB_POOL_TIMEOUT)
+    return g.events_conn
+
+def get_app_conn():
+    """Get the application database connection checked out from the pool for this request."""
+    if 'app_conn' not in g:
+        g.app_conn = app_db.acquire_connection(DB_POOL_TIMEOUT)
+    return g.app_conn
+
+@app.teardown_appcontext
+def release_connections(exception):
+    """Return any connections checked out during the request to their pools."""
+    for key, db in (('events_conn', events_db), ('app_conn', app_db)):
+        conn = g.pop(key, None)
+        if conn is not None:
+            db.release_connection(conn)
+
+def _fetch_all(db, query: str, params: tuple) -> List:
+    """
+    Run a query on the calling thread's connection and return all rows.
+    Query threads keep their own connections instead of using the request
+    pool, so a request holding pooled connections never waits on itself.
+    """
+    return db.get_thread_connection().execute(query, params).fetchall()
+
+def submit_query(db, query: str, params: tuple = ()) -> Future:
+    """
+    Start a read query on the query thread pool and return a Future for its rows.
+    Lets a request overlap queries that do not depend on each other.
+    """
+    return _query_executor.submit(_fetch_all, db, query, params)
+
+def get_pagination_args(default_limit: int) -> tuple:
+    """
+    Read limit and offset from the query string. The limit is clamped to
+    1..MAX_PAGE_SIZE (SQLite treats a negative LIMIT as unbounded) and the
+    offset to zero or more.
+    """
+    limit = max(1, min(int(request.args.get('limit', default_limit)), MAX_PAGE_SIZE))
+    offset = max(0, int(request.args.get('offset', 0)))
+    return limit, offset
+
+def get_pond_type_arg() -> Optional[str]:
+    """
+    Read the pond_type filter from the query string, lowercased to match the
+    stored hex. Raises ValueError if it is not a bytes32 hex string.
+    """
+    pond_type = request.args.get('pond_type')
+    if pond_type is None:
+        return None
+    if not POND_TYPE_PATTERN.fullmatch(pond_type):
+        raise ValueError("pond_type must be a 32-byte hex string")
+    return pond_type.lower()
+
+def normalize_address(address: str) -> Optional[str]:
+    """Lowercase an account address, or return None if it is not 0x plus 40 hex digits."""
+    address = address.lower()
+    return address if ADDRESS_PATTERN.fullmatch(address) else None
+
+def invalid_address_response():
+    """400 response for a malformed address, returned before any database work."""
+    return json_response({
+        "status": "error",
+        "message": "address must be a 0x-prefixed 20-byte hex string"
+    }), 400
+
+def include_total_requested() -> bool:
+    """Whether the client wants the COUNT(*) total (include_total=false skips it)."""
+    return request.args.get('include_total', 'true').lower() != 'false'
+
+@functools.lru_cache(maxsize=256)
+def filtered_sql(template: str, where: str) -> str:
+    """
+    Fill a query template's {where} placeholder. Cached, so each filter
+    combination always yields the same string object and the connection's
+    statement cache finds its prepared statement without re-hashing new text.
+    """
+    return template.format(where=where)
+
+def build_where_clause(conditions: List[tuple]) -> tuple:
+    """
+    Build a parameterized WHERE clause from (condition, value) pairs.
+    Conditions with an empty value are skipped; a tuple value binds one
+    parameter per element. The order of the pairs is fixed by the caller,
+    so the same filter combination always yields the same SQL text and is
+    served from sqlite3's prepared-statement cache.
+    """
+    clauses = []
+    params = []
+    for condition, value in conditions:
+        if value:
+            clauses.append(condition)
+            if isinstance(value, tuple):
+                params.extend(value)
+            else:
+                params.append(value)
+    return (' AND '.join(clauses) if clauses else '1=1'), params
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """API health check endpoint."""
     try:
         # Try to connect to both databases
-        events_conn = events_db.get_connection()
-        app_conn = app_db.get_connection()
+        events_conn = get_events_conn()
+        app_conn = get_app_conn()
         
         # Execute a simple query on each
-        cursor1 = events_conn.cursor()
-        cursor1.execute('SELECT 1')
-        cursor1.fetchone()
-        events_conn.close()
+        events_conn.execute('SELECT 1').fetchone()
+        app_conn.execute('SELECT 1').fetchone()
         
-        cursor2 = app_conn.cursor()
-        cursor2.execute('SELECT 1')
-        cursor2.fetchone()
-        app_conn.close()
-        
-        return jsonify({
+        return json_response({
             "status": "healthy",
             "message": "API is running and databases are accessible",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 200
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return jsonify({
+        return json_response({
             "status": "unhealthy",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/indexer/status', methods=['GET'])
@@ -93,202 +591,165 @@ def health_check():
 def indexer_status():
     """Check the status of the blockchain indexer."""
     try:
-        # Get the last indexed block from events database
-        last_block = events_db.get_last_indexed_block()
-        
-        # Get event counts from events database
-        conn = events_db.get_connection()
-        cursor = conn.cursor()
+        global _status_rows
         
-        # Get toss count
-        cursor.execute('SELECT COUNT(*) FROM coin_tossed_events')
-        toss_count = cursor.fetchone()[0]
-        
-        # Get winner count
-        cursor.execute('SELECT COUNT(*) FROM lucky_winner_selected_events')
-        winner_count = cursor.fetchone()[0]
-        
-        # Get the most recent event timestamp
-        cursor.execute('''
-        SELECT MAX(block_timestamp) 
-        FROM (
-            SELECT MAX(block_timestamp) as block_timestamp FROM coin_tossed_events
-            UNION
-            SELECT MAX(block_timestamp) as block_timestamp FROM lucky_winner_selected_events
-        )
-        ''')
-        last_event_timestamp = cursor.fetchone()[0]
-        
-        # Get user count from application database
-        app_conn = app_db.get_connection()
-        app_cursor = app_conn.cursor()
-        app_cursor.execute('SELECT COUNT(*) FROM user_points')
-        user_count = app_cursor.fetchone()[0]
+        # Reuse the last rows while neither database has been written to
+        data_version = get_data_version()
+        if _status_rows is not None and _status_rows[0] == data_version:
+            _, events_status, app_status = _status_rows
+        else:
+            # Get last indexed block, event counters (maintained by triggers)
+            # and the most recent event timestamp in a single round trip
+            events_future = submit_query(events_db, SQL_EVENTS_STATUS)
+            
+            # Meanwhile get user count and calculator state from the application database
+            app_future = submit_query(app_db, SQL_APP_STATUS)
+            
+            events_status = events_future.result()[0]
+            app_status = app_future.result()[0]
+            _status_rows = (data_version, events_status, app_status)
         
-        # Get calculator state from application database
-        app_cursor.execute('SELECT * FROM calculator_state WHERE id = 1')
-        calculator_state = app_cursor.fetchone()
+        last_block = events_status['last_block'] or 0
+        toss_count = events_status['toss_count'] or 0
+        winner_count = events_status['winner_count'] or 0
+        last_event_timestamp = events_status['last_event_timestamp']
         
-        # Close connections
-        conn.close()
-        app_conn.close()
+        user_count = app_status['user_count']
+        calculator_state = app_status if app_status['id'] is not None else None
         
         # Format results
         last_event_time = datetime.fromtimestamp(last_event_timestamp) if last_event_timestamp else None
         
-        return jsonify({
+        return json_response({
             "status": "active",
             "last_indexed_block": last_block,
             "total_toss_events": toss_count,
             "total_winner_events": winner_count,
             "total_users": user_count,
             "last_event_timestamp": last_event_timestamp,
-            "last_event_time": last_event_time.isoformat() if last_event_time else None,
+            "last_event_time": last_event_time,
             "calculator_state": {
                 "last_processed_toss_id": calculator_state['last_processed_toss_id'] if calculator_state else 0,
                 "last_processed_winner_id": calculator_state['last_processed_winner_id'] if calculator_state else 0,
                 "last_run_timestamp": calculator_state['last_run_timestamp'] if calculator_state else 0
             },
-            "current_time": datetime.now().isoformat()
+            "current_time": now_iso()
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting indexer status: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/leaderboard', methods=['GET'])
 @require_api_key
+@conditional_response
+@cached_response(ttl=30)
 def get_global_leaderboard():
     """
     Get the global leaderboard with sorting options.
     Query parameters:
-    - sort_by: field to sort by (points, toss_points, winner_points, referral_points)
+    - sort_by: field to sort by (total_points, toss_points, winner_points, referral_points)
     - order: asc or desc
     - limit: number of results (default 50)
     - offset: pagination offset (default 0)
+    - after_value, after_id: keyset cursor from a previous page's next_cursor (optional).
+      When given, offset is ignored.
     """
     try:
+        # Reject unknown sort fields rather than silently paging by another column
         sort_by = request.args.get('sort_by', 'total_points')
-        order = request.args.get('order', 'desc').upper()
-        limit = min(int(request.args.get('limit', 50)), 100)  # Max 100 results
-        offset = int(request.args.get('offset', 0))
-        
-        # Map sort_by parameter to actual column names
-        sort_columns = {
-            'total_points': 'up.total_points',
-            'toss_points': 'up.toss_points',
-            'winner_points': 'up.winner_points',
-            'referral_points': 'up.referral_points'
-        }
+        if sort_by not in LEADERBOARD_SORT_COLUMNS:
+            return json_response({
+                "status": "error",
+                "message": "sort_by must be one of: " + ", ".join(sorted(LEADERBOARD_SORT_COLUMNS))
+            }), 400
+        order = "DESC" if request.args.get('order', 'desc').upper() == "DESC" else "ASC"
+        limit, offset = get_pagination_args(default_limit=50)
+        try:
+            cursor_key = get_cursor_args('after_value', 'after_id')
+        except ValueError as e:
+            return json_response({
+                "status": "error",
+                "message": str(e)
+            }), 400
         
-        sort_column = sort_columns.get(sort_by, 'up.total_points')
-        sort_order = "DESC" if order == "DESC" else "ASC"
+        # Without a keyset cursor, start before the first row
+        if cursor_key:
+            after_value, after_id = cursor_key
+            offset = 0
+        else:
+            after_value, after_id = LEADERBOARD_SEEKS[order][1]
+        
+        # Pick the prebuilt statement for this sort
+        query = SQL_LEADERBOARD_PAGES[(sort_by, order)]
         
         # Get connection to application database
-        conn = app_db.get_connection()
-        cursor = conn.cursor()
+        conn = get_app_conn()
         
-        # Build query for leaderboard
-        query = f'''
-        SELECT 
-            up.address,
-            up.total_points,
-            up.toss_points,
-            up.winner_points,
-            up.referral_points,
-            ur.referral_code,
-            (SELECT COUNT(*) FROM user_referrals WHERE referrer_address = up.address) as referrals_count,
-            (SELECT COUNT(*) FROM user_referrals WHERE referrer_address = up.address AND is_activated = 1) as activated_referrals
-        FROM user_points up
-        LEFT JOIN user_referrals ur ON up.address = ur.address
-        ORDER BY {sort_column} {sort_order}
-        LIMIT ? OFFSET ?
-        '''
-        
-        cursor.execute(query, (limit, offset))
-        users = cursor.fetchall()
-        
-        # Count total users for pagination info
-        cursor.execute('SELECT COUNT(*) FROM user_points')
-        total_users = cursor.fetchone()[0]
-        
-        # Connect to events database to get toss and win data
-        events_conn = events_db.get_connection()
-        events_cursor = events_conn.cursor()
-        
-        # Convert to list of dictionaries with full user stats
-        result = []
-        for user in users:
-            address = user['address']
-            
-            # Get toss data
-            events_cursor.execute('''
-            SELECT COUNT(*) as toss_count, SUM(CAST(amount as DECIMAL)) as total_value
-            FROM coin_tossed_events
-            WHERE frog_address = ?
-            ''', (address,))
-            toss_data = events_cursor.fetchone()
-            
-            # Get win data
-            events_cursor.execute('''
-            SELECT COUNT(*) as win_count
-            FROM lucky_winner_selected_events
-            WHERE winner_address = ?
-            ''', (address,))
-            win_data = events_cursor.fetchone()
-            
-            # Build user stats
-            user_stats = {
-                "address": address,
-                "total_points": user['total_points'],
-                "toss_points": user['toss_points'],
-                "winner_points": user['winner_points'],
-                "referral_points": user['referral_points'],
-                "referral_code": user['referral_code'],
-                "referrals_count": user['referrals_count'],
-                "referrals_activated": user['activated_referrals'],
-                "total_tosses": toss_data['toss_count'] if toss_data else 0,
-                "total_value_spent": str(toss_data['total_value'] or 0) if toss_data else "0",
-                "total_wins": win_data['win_count'] if win_data else 0
+        # Rows come back as plain dicts, event totals included, and become the
+        # leaderboard entries as-is
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row_factory
+        # Fetch one extra row to learn whether another page exists
+        users = cursor.execute(query, {
+            'limit': limit + 1,
+            'offset': offset,
+            'after_value': after_value,
+            'after_id': after_id
+        }).fetchall()
+        has_more = len(users) > limit
+        users = users[:limit]
+        
+        # Cursor for the next page, if there is one
+        next_cursor = None
+        if has_more:
+            next_cursor = {
+                "after_value": users[-1][sort_by],
+                "after_id": users[-1]['id']
             }
-            result.append(user_stats)
+        for user in users:
+            del user['id']
         
-        # Close connections
-        conn.close()
-        events_conn.close()
+        # Total users for pagination info, from the trigger-maintained counter
+        total_users = conn.execute(SQL_USER_COUNT).fetchone()[0]
         
-        return jsonify({
-            "leaderboard": result,
+        return json_response({
+            "leaderboard": users,
             "total_users": total_users,
             "limit": limit,
             "offset": offset,
             "sort_by": sort_by,
-            "order": order
+            "order": order,
+            "has_more": has_more,
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting leaderboard: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/user/<address>', methods=['GET'])
 @require_api_key
+@conditional_response
+@cached_response(ttl=30)
 def get_user_data(address):
     """Get detailed data for a specific user."""
     try:
         # Normalize address
-        address = address.lower()
+        address = normalize_address(address)
+        if address is None:
+            return invalid_address_response()
         
         # Get application database connection
-        app_conn = app_db.get_connection()
-        app_cursor = app_conn.cursor()
+        app_conn = get_app_conn()
         
         # Initialize result structure
         result = {
@@ -306,111 +767,77 @@ def get_user_data(address):
             "total_wins": 0
         }
         
-        # Get points info
-        app_cursor.execute('SELECT * FROM user_points WHERE address = ?', (address,))
-        points_data = app_cursor.fetchone()
-        if points_data:
-            result["total_points"] = points_data["total_points"]
-            result["toss_points"] = points_data["toss_points"]
-            result["winner_points"] = points_data["winner_points"]
-            result["referral_points"] = points_data["referral_points"]
-        
-        # Get referral info for this user
-        app_cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
-        referral_data = app_cursor.fetchone()
-        if referral_data:
-            result["referral_code"] = referral_data["referral_code"]
-            
-            # If this user has a referrer, get that referrer's code
-            if referral_data["referrer_address"]:
-                app_cursor.execute('SELECT referral_code FROM user_referrals WHERE address = ?', 
-                               (referral_data["referrer_address"],))
-                referrer_code = app_cursor.fetchone()
-                if referrer_code:
-                    result["referrer_code_used"] = referrer_code["referral_code"]
+        # Get points, referral code, referrer's code, referral counts and event
+        # totals in one statement
+        app_data = app_conn.execute(SQL_USER_APP_DATA, (address,)).fetchone()
+        if app_data["has_points"]:
+            result["total_points"] = app_data["total_points"]
+            result["toss_points"] = app_data["toss_points"]
+            result["winner_points"] = app_data["winner_points"]
+            result["referral_points"] = app_data["referral_points"]
+        if app_data["has_referral"]:
+            result["referral_code"] = app_data["referral_code"]
+            result["referrer_code_used"] = app_data["referrer_code"]
         
         # Count referrals: people who used THIS user's referral code
-        app_cursor.execute('''
-        SELECT 
-            COUNT(*) as total_referrals,
-            COALESCE(SUM(is_activated), 0) as active_referrals
-        FROM user_referrals 
-        WHERE referrer_address = ?
-        ''', (address,))
-        
-        referral_counts = app_cursor.fetchone()
-        if referral_counts:
-            result["referrals_count"] = referral_counts["total_referrals"] or 0
-            result["referrals_activated"] = referral_counts["active_referrals"] or 0
-        
-        # Get events database connection for toss and win data
-        events_conn = events_db.get_connection()
-        events_cursor = events_conn.cursor()
-        
-        # Get toss info
-        events_cursor.execute('''
-        SELECT COUNT(*), COALESCE(SUM(CAST(amount as DECIMAL)), 0) 
-        FROM coin_tossed_events 
-        WHERE frog_address = ?
-        ''', (address,))
-        
-        toss_data = events_cursor.fetchone()
-        if toss_data:
-            result["total_tosses"] = toss_data[0]
-            result["total_value_spent"] = str(toss_data[1])
-        
-        # Get win info
-        events_cursor.execute('''
-        SELECT COUNT(*) 
-        FROM lucky_winner_selected_events 
-        WHERE winner_address = ?
-        ''', (address,))
-        
-        win_count = events_cursor.fetchone()
-        if win_count:
-            result["total_wins"] = win_count[0]
-        
-        # Close connections
-        app_conn.close()
-        events_conn.close()
+        result["referrals_count"] = app_data["total_referrals"]
+        result["referrals_activated"] = app_data["active_referrals"]
+        
+        # Toss and win totals maintained by the points calculator
+        result["total_tosses"] = app_data["total_tosses"]
+        result["total_value_spent"] = app_data["total_value_spent"]
+        result["total_wins"] = app_data["total_wins"]
         
         # Check if the user exists (has any activity)
         if (result["total_tosses"] == 0 and result["total_wins"] == 0 and 
-            not points_data and not referral_data):
-            return jsonify(result), 404
+            not app_data["has_points"] and not app_data["has_referral"]):
+            return json_response(result), 404
         
-        return jsonify(result), 200
+        return json_response(result), 200
         
     except Exception as e:
         logger.error(f"Error getting user data: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/events/wins', methods=['GET'])
 @require_api_key
+@conditional_response
+@cached_response(ttl=30)
 def get_wins():
     """
     Get list of winner events.
     Query parameters:
     - limit: number of results (default 20)
     - offset: pagination offset (default 0)  
+    - include_total: set to false to skip the total count (optional)
     - pond_type: filter by pond type (optional)
     - token_address: filter by token address (optional)
     - user_address: filter by user address (optional)
     - start_time: filter events after this timestamp (ISO format, optional)
     - end_time: filter events before this timestamp (ISO format, optional)
+    - before_ts, before_id: keyset cursor from a previous page's next_cursor (optional).
+      When given, offset is ignored and total_winners is not computed.
     """
     try:
-        limit = min(int(request.args.get('limit', 20)), 100)  # Max 100 results
-        offset = int(request.args.get('offset', 0))
-        pond_type = request.args.get('pond_type')
+        limit, offset = get_pagination_args(default_limit=20)
+        try:
+            pond_type = get_pond_type_arg()
+            cursor_key = get_keyset_cursor_args()
+        except ValueError as e:
+            return json_response({
+                "status": "error",
+                "message": str(e)
+            }), 400
         token_address = request.args.get('token_address')
         user_address = request.args.get('user_address')
         start_time = request.args.get('start_time')
         end_time = request.args.get('end_time')
+        if cursor_key:
+            offset = 0
         
         # Normalize addresses if provided
         if token_address:
@@ -429,135 +856,101 @@ def get_wins():
             end_timestamp = int(datetime.fromisoformat(end_time).timestamp())
         
         # Get events database connection
-        conn = events_db.get_connection()
-        cursor = conn.cursor()
-        
-        # Build query with filters
-        query = '''
-        SELECT 
-            lw.tx_hash,
-            lw.block_number,
-            lw.block_timestamp,
-            lw.pond_type,
-            lw.winner_address,
-            lw.prize,
-            lw.selector,
-            lw.token_address
-        FROM lucky_winner_selected_events lw
-        WHERE 1=1
-        '''
-        
-        params = []
-        
-        # Add filters
-        if pond_type:
-            query += ' AND lw.pond_type = ?'
-            params.append(pond_type)
-            
-        if token_address:
-            query += ' AND lw.token_address = ?'
-            params.append(token_address)
-            
-        if user_address:
-            query += ' AND lw.winner_address = ?'
-            params.append(user_address)
-            
-        # Add time range filters
-        if start_timestamp:
-            query += ' AND lw.block_timestamp >= ?'
-            params.append(start_timestamp)
-            
-        if end_timestamp:
-            query += ' AND lw.block_timestamp <= ?'
-            params.append(end_timestamp)
-        
-        # Add ordering and pagination
-        query += ' ORDER BY lw.block_timestamp DESC LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        winners = cursor.fetchall()
+        conn = get_events_conn()
+        
+        # Build filters shared by the page and count queries; the page query
+        # additionally seeks past the cursor when one is given
+        filters = [
+            ('pond_type = ?', pond_type),
+            ('token_address = ?', token_address),
+            ('winner_address = ?', user_address),
+            ('block_timestamp >= ?', start_timestamp),
+            ('block_timestamp <= ?', end_timestamp)
+        ]
+        where_clause, params = build_where_clause(filters)
+        page_clause, page_params = build_where_clause(
+            filters + [('(block_timestamp, id) < (?, ?)', cursor_key)]
+        )
         
-        # Count total winners for pagination info
-        count_query = 'SELECT COUNT(*) FROM lucky_winner_selected_events WHERE 1=1'
-        count_params = []
+        query = filtered_sql(SQL_WINNERS_PAGE, page_clause)
         
-        if pond_type:
-            count_query += ' AND pond_type = ?'
-            count_params.append(pond_type)
-            
-        if token_address:
-            count_query += ' AND token_address = ?'
-            count_params.append(token_address)
-            
-        if user_address:
-            count_query += ' AND winner_address = ?'
-            count_params.append(user_address)
-            
-        # Add time range filters to count query
-        if start_timestamp:
-            count_query += ' AND block_timestamp >= ?'
-            count_params.append(start_timestamp)
-            
-        if end_timestamp:
-            count_query += ' AND block_timestamp <= ?'
-            count_params.append(end_timestamp)
+        # Count total winners for pagination info (skipped when paging by cursor
+        # or when the client opted out)
+        total_winners = None
+        if not cursor_key and include_total_requested():
+            if params:
+                total_winners = conn.execute(filtered_sql(SQL_WINNERS_COUNT, where_clause), params).fetchone()[0]
+            else:
+                # Unfiltered: read the trigger-maintained counter instead of counting
+                total_winners = conn.execute(SQL_TOTAL_WINNERS).fetchone()[0]
         
-        cursor.execute(count_query, count_params)
-        total_winners = cursor.fetchone()[0]
+        # Fetch one extra row to learn whether another page exists; rows stay
+        # plain tuples
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        winners = cursor.execute(query, page_params + [limit + 1, offset]).fetchall()
+        has_more = len(winners) > limit
+        winners = winners[:limit]
+        
+        # Cursor for the next page, if there is one
+        next_cursor = None
+        if has_more:
+            next_cursor = {
+                "before_ts": winners[-1][-2],
+                "before_id": winners[-1][-1]
+            }
         
         # Convert to list of dictionaries
-        result = []
-        for winner in winners:
-            # Format timestamp as ISO date
-            timestamp = datetime.fromtimestamp(winner['block_timestamp']).isoformat()
-            
-            result.append({
-                "tx_hash": winner['tx_hash'],
-                "block_number": winner['block_number'],
-                "timestamp": timestamp,
-                "pond_type": winner['pond_type'],
-                "winner_address": winner['winner_address'],
-                "prize": winner['prize'],
-                "selector": winner['selector'],
-                "token_address": winner['token_address']
-            })
-        
-        conn.close()
-        
-        return jsonify({
+        result = [dict(zip(WINNER_ITEM_COLUMNS, winner)) for winner in winners]
+        
+        return json_response({
             "winners": result,
             "total_winners": total_winners,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "has_more": has_more,
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting winners: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/events/tosses', methods=['GET'])
 @require_api_key
+@conditional_response
+@cached_response(ttl=30)
 def get_tosses():
     """
     Get list of coin toss events.
     Query parameters:
     - limit: number of results (default 20)
     - offset: pagination offset (default 0)
+    - include_total: set to false to skip the total count (optional)
     - pond_type: filter by pond type (optional)
     - token_address: filter by token address (optional)
     - user_address: filter by user address (optional)
+    - before_ts, before_id: keyset cursor from a previous page's next_cursor (optional).
+      When given, offset is ignored and total_tosses is not computed.
     """
     try:
-        limit = min(int(request.args.get('limit', 20)), 100)  # Max 100 results
-        offset = int(request.args.get('offset', 0))
-        pond_type = request.args.get('pond_type')
+        limit, offset = get_pagination_args(default_limit=20)
+        try:
+            pond_type = get_pond_type_arg()
+            cursor_key = get_keyset_cursor_args()
+        except ValueError as e:
+            return json_response({
+                "status": "error",
+                "message": str(e)
+            }), 400
         token_address = request.args.get('token_address')
         user_address = request.args.get('user_address')
+        if cursor_key:
+            offset = 0
         
         # Normalize addresses if provided
         if token_address:
@@ -566,121 +959,101 @@ def get_tosses():
             user_address = user_address.lower()
         
         # Get events database connection
-        conn = events_db.get_connection()
-        cursor = conn.cursor()
-        
-        # Build query with filters
-        query = '''
-        SELECT 
-            ct.tx_hash,
-            ct.block_number,
-            ct.block_timestamp,
-            ct.pond_type,
-            ct.frog_address,
-            ct.amount,
-            ct.timestamp,
-            ct.total_pond_tosses,
-            ct.total_pond_value,
-            ct.token_address
-        FROM coin_tossed_events ct
-        WHERE 1=1
-        '''
-        
-        params = []
-        
-        # Add filters
-        if pond_type:
-            query += ' AND ct.pond_type = ?'
-            params.append(pond_type)
-            
-        if token_address:
-            query += ' AND ct.token_address = ?'
-            params.append(token_address)
-            
-        if user_address:
-            query += ' AND ct.frog_address = ?'
-            params.append(user_address)
-        
-        # Add ordering and pagination
-        query += ' ORDER BY ct.block_timestamp DESC LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        tosses = cursor.fetchall()
+        conn = get_events_conn()
+        
+        # Build filters shared by the page and count queries; the page query
+        # additionally seeks past the cursor when one is given
+        filters = [
+            ('pond_type = ?', pond_type),
+            ('token_address = ?', token_address),
+            ('frog_address = ?', user_address)
+        ]
+        where_clause, params = build_where_clause(filters)
+        page_clause, page_params = build_where_clause(
+            filters + [('(block_timestamp, id) < (?, ?)', cursor_key)]
+        )
         
-        # Count total tosses for pagination info
-        count_query = 'SELECT COUNT(*) FROM coin_tossed_events WHERE 1=1'
-        count_params = []
+        query = filtered_sql(SQL_TOSSES_PAGE, page_clause)
         
-        if pond_type:
-            count_query += ' AND pond_type = ?'
-            count_params.append(pond_type)
-            
-        if token_address:
-            count_query += ' AND token_address = ?'
-            count_params.append(token_address)
-            
-        if user_address:
-            count_query += ' AND frog_address = ?'
-            count_params.append(user_address)
+        # Count total tosses for pagination info (skipped when paging by cursor
+        # or when the client opted out)
+        total_tosses = None
+        if not cursor_key and include_total_requested():
+            if params:
+                total_tosses = conn.execute(filtered_sql(SQL_TOSSES_COUNT, where_clause), params).fetchone()[0]
+            else:
+                # Unfiltered: read the trigger-maintained counter instead of counting
+                total_tosses = conn.execute(SQL_TOTAL_TOSSES).fetchone()[0]
         
-        cursor.execute(count_query, count_params)
-        total_tosses = cursor.fetchone()[0]
+        # Fetch one extra row to learn whether another page exists; rows stay
+        # plain tuples
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        tosses = cursor.execute(query, page_params + [limit + 1, offset]).fetchall()
+        has_more = len(tosses) > limit
+        tosses = tosses[:limit]
+        
+        # Cursor for the next page, if there is one
+        next_cursor = None
+        if has_more:
+            next_cursor = {
+                "before_ts": tosses[-1][-2],
+                "before_id": tosses[-1][-1]
+            }
         
         # Convert to list of dictionaries
-        result = []
-        for toss in tosses:
-            # Format timestamp as ISO date
-            timestamp = datetime.fromtimestamp(toss['block_timestamp']).isoformat()
-            
-            result.append({
-                "tx_hash": toss['tx_hash'],
-                "block_number": toss['block_number'],
-                "timestamp": timestamp,
-                "pond_type": toss['pond_type'],
-                "frog_address": toss['frog_address'],
-                "amount": toss['amount'],
-                "total_pond_tosses": toss['total_pond_tosses'],
-                "total_pond_value": toss['total_pond_value'],
-                "token_address": toss['token_address']
-            })
-        
-        conn.close()
-        
-        return jsonify({
+        result = [dict(zip(TOSS_ITEM_COLUMNS, toss)) for toss in tosses]
+        
+        return json_response({
             "tosses": result,
             "total_tosses": total_tosses,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "has_more": has_more,
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         logger.error(f"Error getting coin tosses: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/events/tosses/<address>', methods=['GET'])
 @require_api_key
+@conditional_response
 def get_user_tosses(address):
     """
     Get list of coin toss events for a specific user.
     Query parameters:
     - limit: number of results (default 20)
     - offset: pagination offset (default 0)
+    - include_total: set to false to skip the total count (optional)
     - token_address: filter by token address (optional)
     - start_time: filter events after this timestamp (ISO format, optional)
     - end_time: filter events before this timestamp (ISO format, optional)
+    - before_ts, before_id: keyset cursor from a previous page's next_cursor (optional).
+      When given, offset is ignored and total_tosses is not computed.
     """
     try:
-        limit = min(int(request.args.get('limit', 20)), 100)  # Max 100 results
-        offset = int(request.args.get('offset', 0))
+        limit, offset = get_pagination_args(default_limit=20)
+        try:
+            cursor_key = get_keyset_cursor_args()
+        except ValueError as e:
+            return json_response({
+                "status": "error",
+                "message": str(e)
+            }), 400
+        if cursor_key:
+            offset = 0
         token_address = request.args.get('token_address')
         start_time = request.args.get('start_time')
         end_time = request.args.get('end_time')
-        address = address.lower()
+        address = normalize_address(address)
+        if address is None:
+            return invalid_address_response()
         
         # Normalize token address if provided
         if token_address:
@@ -697,113 +1070,87 @@ def get_user_tosses(address):
             end_timestamp = int(datetime.fromisoformat(end_time).timestamp())
         
         # Get events database connection
-        conn = events_db.get_connection()
-        cursor = conn.cursor()
-        
-        # Build query with optional token filter
-        query = '''
-        SELECT 
-            id, tx_hash, block_number, block_timestamp, pond_type, 
-            amount, timestamp, total_pond_tosses, total_pond_value, token_address
-        FROM coin_tossed_events 
-        WHERE frog_address = ?
-        '''
-        params = [address]
-        
-        if token_address:
-            query += ' AND token_address = ?'
-            params.append(token_address)
-            
-        # Add time range filters
-        if start_timestamp:
-            query += ' AND block_timestamp >= ?'
-            params.append(start_timestamp)
-            
-        if end_timestamp:
-            query += ' AND block_timestamp <= ?'
-            params.append(end_timestamp)
-        
-        query += ' ORDER BY block_timestamp DESC LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        tosses = cursor.fetchall()
-        
-        # Count total tosses for pagination
-        count_query = 'SELECT COUNT(*) FROM coin_tossed_events WHERE frog_address = ?'
-        count_params = [address]
+        conn = get_events_conn()
+        
+        # Build filters shared by the page and count queries; the page query
+        # additionally seeks past the cursor when one is given
+        filters = [
+            ('frog_address = ?', address),
+            ('token_address = ?', token_address),
+            ('block_timestamp >= ?', start_timestamp),
+            ('block_timestamp <= ?', end_timestamp)
+        ]
+        where_clause, params = build_where_clause(filters)
+        page_clause, page_params = build_where_clause(
+            filters + [('(block_timestamp, id) < (?, ?)', cursor_key)]
+        )
         
-        if token_address:
-            count_query += ' AND token_address = ?'
-            count_params.append(token_address)
-            
-        # Add time range filters to count query
-        if start_timestamp:
-            count_query += ' AND block_timestamp >= ?'
-            count_params.append(start_timestamp)
-            
-        if end_timestamp:
-            count_query += ' AND block_timestamp <= ?'
-            count_params.append(end_timestamp)
+        query = filtered_sql(SQL_USER_TOSSES_PAGE, page_clause)
         
-        cursor.execute(count_query, count_params)
-        total_tosses = cursor.fetchone()[0]
+        # Count total tosses for pagination (skipped when paging by cursor or
+        # when the client opted out)
+        total_tosses = None
+        if not cursor_key and include_total_requested():
+            total_tosses = conn.execute(filtered_sql(SQL_TOSSES_COUNT, where_clause), params).fetchone()[0]
         
-        # Convert to list of dictionaries
-        result = []
-        for toss in tosses:
-            # Format timestamp as ISO date
-            timestamp = datetime.fromtimestamp(toss['block_timestamp']).isoformat()
-            
-            result.append({
-                "id": toss['id'],
-                "tx_hash": toss['tx_hash'],
-                "block_number": toss['block_number'],
-                "timestamp": timestamp,
-                "pond_type": toss['pond_type'],
-                "amount": toss['amount'],
-                "total_pond_tosses": toss['total_pond_tosses'],
-                "total_pond_value": toss['total_pond_value'],
-                "token_address": toss['token_address']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            "address": address,
-            "tosses": result,
-            "total_tosses": total_tosses,
-            "limit": limit,
-            "offset": offset
-        }), 200
+        # Stream the page straight from the cursor as plain tuples; one extra
+        # row is fetched to learn whether another page exists
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, page_params + [limit + 1, offset])
+        return stream_json_page(
+            {
+                "address": address,
+                "total_tosses": total_tosses,
+                "limit": limit,
+                "offset": offset
+            },
+            "tosses", cursor, limit,
+            lambda row: dict(zip(USER_TOSS_ITEM_COLUMNS, row)),
+            keyset_page_tail
+        ), 200
         
     except Exception as e:
         logger.error(f"Error getting user tosses: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/events/wins/<address>', methods=['GET'])
 @require_api_key
+@conditional_response
 def get_user_wins(address):
     """
     Get list of winner events for a specific user.
     Query parameters:
     - limit: number of results (default 20)
     - offset: pagination offset (default 0)
+    - include_total: set to false to skip the total count (optional)
     - token_address: filter by token address (optional)
     - start_time: filter events after this timestamp (ISO format, optional)
     - end_time: filter events before this timestamp (ISO format, optional)
+    - before_ts, before_id: keyset cursor from a previous page's next_cursor (optional).
+      When given, offset is ignored and total_wins is not computed.
     """
     try:
-        limit = min(int(request.args.get('limit', 20)), 100)  # Max 100 results
-        offset = int(request.args.get('offset', 0))
+        limit, offset = get_pagination_args(default_limit=20)
+        try:
+            cursor_key = get_keyset_cursor_args()
+        except ValueError as e:
+            return json_response({
+                "status": "error",
+                "message": str(e)
+            }), 400
+        if cursor_key:
+            offset = 0
         token_address = request.args.get('token_address')
         start_time = request.args.get('start_time')
         end_time = request.args.get('end_time')
-        address = address.lower()
+        address = normalize_address(address)
+        if address is None:
+            return invalid_address_response()
         
         # Normalize token address if provided
         if token_address:
@@ -820,91 +1167,52 @@ def get_user_wins(address):
             end_timestamp = int(datetime.fromisoformat(end_time).timestamp())
         
         # Get events database connection
-        conn = events_db.get_connection()
-        cursor = conn.cursor()
-        
-        # Build query with optional token filter
-        query = '''
-        SELECT 
-            id, tx_hash, block_number, block_timestamp, pond_type, 
-            prize, selector, token_address
-        FROM lucky_winner_selected_events 
-        WHERE winner_address = ?
-        '''
-        params = [address]
-        
-        if token_address:
-            query += ' AND token_address = ?'
-            params.append(token_address)
-            
-        # Add time range filters
-        if start_timestamp:
-            query += ' AND block_timestamp >= ?'
-            params.append(start_timestamp)
-            
-        if end_timestamp:
-            query += ' AND block_timestamp <= ?'
-            params.append(end_timestamp)
-        
-        query += ' ORDER BY block_timestamp DESC LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        wins = cursor.fetchall()
+        conn = get_events_conn()
+        
+        # Build filters shared by the page and count queries; the page query
+        # additionally seeks past the cursor when one is given
+        filters = [
+            ('winner_address = ?', address),
+            ('token_address = ?', token_address),
+            ('block_timestamp >= ?', start_timestamp),
+            ('block_timestamp <= ?', end_timestamp)
+        ]
+        where_clause, params = build_where_clause(filters)
+        page_clause, page_params = build_where_clause(
+            filters + [('(block_timestamp, id) < (?, ?)', cursor_key)]
+        )
         
-        # Count total wins for pagination
-        count_query = 'SELECT COUNT(*) FROM lucky_winner_selected_events WHERE winner_address = ?'
-        count_params = [address]
+        query = filtered_sql(SQL_USER_WINS_PAGE, page_clause)
         
-        if token_address:
-            count_query += ' AND token_address = ?'
-            count_params.append(token_address)
-            
-        # Add time range filters to count query
-        if start_timestamp:
-            count_query += ' AND block_timestamp >= ?'
-            count_params.append(start_timestamp)
-            
-        if end_timestamp:
-            count_query += ' AND block_timestamp <= ?'
-            count_params.append(end_timestamp)
+        # Count total wins for pagination (skipped when paging by cursor or
+        # when the client opted out)
+        total_wins = None
+        if not cursor_key and include_total_requested():
+            total_wins = conn.execute(filtered_sql(SQL_WINNERS_COUNT, where_clause), params).fetchone()[0]
         
-        cursor.execute(count_query, count_params)
-        total_wins = cursor.fetchone()[0]
-        
-        # Convert to list of dictionaries
-        result = []
-        for win in wins:
-            # Format timestamp as ISO date
-            timestamp = datetime.fromtimestamp(win['block_timestamp']).isoformat()
-            
-            result.append({
-                "id": win['id'],
-                "tx_hash": win['tx_hash'],
-                "block_number": win['block_number'],
-                "timestamp": timestamp,
-                "pond_type": win['pond_type'],
-                "prize": win['prize'],
-                "selector": win['selector'],
-                "token_address": win['token_address']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            "address": address,
-            "wins": result,
-            "total_wins": total_wins,
-            "limit": limit,
-            "offset": offset
-        }), 200
+        # Stream the page straight from the cursor as plain tuples; one extra
+        # row is fetched to learn whether another page exists
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query, page_params + [limit + 1, offset])
+        return stream_json_page(
+            {
+                "address": address,
+                "total_wins": total_wins,
+                "limit": limit,
+                "offset": offset
+            },
+            "wins", cursor, limit,
+            lambda row: dict(zip(USER_WIN_ITEM_COLUMNS, row)),
+            keyset_page_tail
+        ), 200
         
     except Exception as e:
         logger.error(f"Error getting user wins: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/referral/code/<address>', methods=['GET'])
@@ -913,20 +1221,16 @@ def get_referral_code(address):
     """Get or create a referral code for a user."""
     try:
         # Normalize address
-        address = address.lower()
+        address = normalize_address(address)
+        if address is None:
+            return invalid_address_response()
         
         # Use the referral system to get or create the code
         user_referral = referral_system.get_or_create_user_referral(address)
         
-        # Check if this user already has a referrer
-        app_conn = app_db.get_connection()
-        cursor = app_conn.cursor()
-        cursor.execute('SELECT referrer_address FROM user_referrals WHERE address = ?', (address,))
-        result = cursor.fetchone()
-        has_referrer = result and result['referrer_address'] is not None
-        app_conn.close()
-        
-        return jsonify({
+        # The referral record already says whether this user has a referrer
+        has_referrer = user_referral["referrer_address"] is not None
+        return json_response({
             "address": address,
             "referral_code": user_referral["referral_code"],
             "created_at": user_referral["created_at"],
@@ -936,10 +1240,10 @@ def get_referral_code(address):
         
     except Exception as e:
         logger.error(f"Error getting referral code: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
 @app.route('/referral/apply', methods=['POST'])
@@ -950,45 +1254,46 @@ def apply_referral():
         data = request.json
         
         if not data or 'address' not in data or 'referral_code' not in data:
-            return jsonify({
+            return json_response({
                 "status": "error",
                 "message": "Missing required fields: address and referral_code"
             }), 400
         
         # Normalize address
-        address = data['address'].lower()
+        address = normalize_address(data['address'])
+        if address is None:
+            return invalid_address_response()
         referral_code = data['referral_code'].upper()
         
         # Use the referral system to apply the code
         success, message = referral_system.apply_referral_code(address, referral_code)
         
         if success:
-            return jsonify({
+            return json_response({
                 "status": "success",
                 "message": message
             }), 200
         else:
-            return jsonify({
+            return json_response({
                 "status": "error",
                 "message": message
             }), 400
         
     except Exception as e:
         logger.error(f"Error applying referral code: {e}")
-        return jsonify({
+        return json_response({
             "status": "error",
             "message": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }), 500
 
-@app.route('/', methods=['GET'])
-def api_documentation():
-    """API documentation endpoint."""
+def build_api_documentation() -> Dict[str, Any]:
+    """Build the API documentation served at the root endpoint."""
     
     # Show API auth status in documentation
     auth_status = "required" if REQUIRE_AUTH else "disabled"
     
-    return jsonify({
+    return {
         "name": "Lucky Ponds API",
         "version": "2.0.0",
         "authentication": auth_status,
@@ -1016,7 +1321,9 @@ def api_documentation():
                     "sort_by": "Field to sort by (total_points, toss_points, winner_points, referral_points)",
                     "order": "Sort order (asc, desc)",
                     "limit": "Number of results to return",
-                    "offset": "Pagination offset"
+                    "offset": "Pagination offset",
+                    "after_value": "Keyset cursor sort value from next_cursor (optional, use with after_id)",
+                    "after_id": "Keyset cursor id from next_cursor (optional, use with after_value)"
                 }
             },
             "/user/<address>": {
@@ -1031,11 +1338,14 @@ def api_documentation():
                 "parameters": {
                     "limit": "Number of results to return",
                     "offset": "Pagination offset",
+                    "include_total": "Set to false to skip computing the total count (optional)",
                     "pond_type": "Filter by pond type (optional)",
                     "token_address": "Filter by token address (optional)",
                     "user_address": "Filter by user address (optional)",
                     "start_time": "Filter by start time in timestamp format (optional)",
-                    "end_time": "Filter by end time in timestamp format (optional)"
+                    "end_time": "Filter by end time in timestamp format (optional)",
+                    "before_ts": "Keyset cursor timestamp from next_cursor (optional, use with before_id)",
+                    "before_id": "Keyset cursor id from next_cursor (optional, use with before_ts)"
                 }
             },
             "/events/tosses": {
@@ -1045,11 +1355,14 @@ def api_documentation():
                 "parameters": {
                     "limit": "Number of results to return",
                     "offset": "Pagination offset",
+                    "include_total": "Set to false to skip computing the total count (optional)",
                     "pond_type": "Filter by pond type (optional)",
                     "token_address": "Filter by token address (optional)",
                     "user_address": "Filter by user address (optional)",
                     "start_time": "Filter by start time in timestamp format (optional)",
-                    "end_time": "Filter by end time in timestamp format (optional)"
+                    "end_time": "Filter by end time in timestamp format (optional)",
+                    "before_ts": "Keyset cursor timestamp from next_cursor (optional, use with before_id)",
+                    "before_id": "Keyset cursor id from next_cursor (optional, use with before_ts)"
                 }
             },
             "/referral/code/<address>": {
@@ -1073,9 +1386,12 @@ def api_documentation():
                 "parameters": {
                     "limit": "Number of results to return",
                     "offset": "Pagination offset",
+                    "include_total": "Set to false to skip computing the total count (optional)",
                     "token_address": "Filter by token address (optional)",
                     "start_time": "Filter by start time in timestamp format (optional)",
-                    "end_time": "Filter by end time in timestamp format (optional)"
+                    "end_time": "Filter by end time in timestamp format (optional)",
+                    "before_ts": "Keyset cursor timestamp from next_cursor (optional, use with before_id)",
+                    "before_id": "Keyset cursor id from next_cursor (optional, use with before_ts)"
                 }
             },
             "/events/wins/<address>": {
@@ -1085,9 +1401,12 @@ def api_documentation():
                 "parameters": {
                     "limit": "Number of results to return",
                     "offset": "Pagination offset",
+                    "include_total": "Set to false to skip computing the total count (optional)",
                     "token_address": "Filter by token address (optional)",
                     "start_time": "Filter by start time in timestamp format (optional)",
-                    "end_time": "Filter by end time in timestamp format (optional)"
+                    "end_time": "Filter by end time in timestamp format (optional)",
+                    "before_ts": "Keyset cursor timestamp from next_cursor (optional, use with before_id)",
+                    "before_id": "Keyset cursor id from next_cursor (optional, use with before_ts)"
                 }
             }
         },
@@ -1096,38 +1415,66 @@ def api_documentation():
             "header": "X-API-Key",
             "status": auth_status
         }
-    }), 200
+    }
+
+# The documentation never changes while the process runs, so it is serialized once
+API_DOCUMENTATION_JSON = orjson.dumps(build_api_documentation(), option=orjson.OPT_SORT_KEYS)
+API_DOCUMENTATION_ETAG = hashlib.sha1(API_DOCUMENTATION_JSON).hexdigest()
+
+@app.route('/', methods=['GET'])
+def api_documentation():
+    """API documentation endpoint."""
+    if request.if_none_match.contains(API_DOCUMENTATION_ETAG):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(API_DOCUMENTATION_JSON, status=200, mimetype='application/json')
+    response.set_etag(API_DOCUMENTATION_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
 
 # Add CORS support
+@app.before_request
+def answer_preflight():
+    """Answer CORS preflight requests up front with an empty, long-cacheable 204."""
+    if request.method == 'OPTIONS':
+        response = app.response_class(status=204)
+        response.headers['Access-Control-Max-Age'] = CORS_MAX_AGE
+        return response
+
 @app.after_request
 def add_cors_headers(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-API-Key')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE')
+    """Set the CORS headers in one pass, replacing rather than appending values."""
+    response.headers.update(CORS_HEADERS)
     return response
 
-# Error handlers
+# Error handlers; their bodies never change, so they are serialized once
+NOT_FOUND_JSON = orjson.dumps({
+    "status": "error",
+    "message": "Endpoint not found"
+}, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+UNAUTHORIZED_JSON = orjson.dumps({
+    "status": "error",
+    "message": "Unauthorized. API key required.",
+    "authentication_method": "API Key via X-API-Key header"
+}, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+SERVER_ERROR_JSON = orjson.dumps({
+    "status": "error",
+    "message": "Internal server error"
+}, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
-        "status": "error",
-        "message": "Endpoint not found"
-    }), 404
+    return app.response_class(NOT_FOUND_JSON, status=404, mimetype='application/json')
 
 @app.errorhandler(401)
 def unauthorized(error):
-    return jsonify({
-        "status": "error",
-        "message": "Unauthorized. API key required.",
-        "authentication_method": "API Key via X-API-Key header"
-    }), 401
+    return app.response_class(UNAUTHORIZED_JSON, status=401, mimetype='application/json')
 
 @app.errorhandler(500)
 def server_error(error):
-    return jsonify({
-        "status": "error",
-        "message": "Internal server error"
-    }), 500
+    return app.response_class(SERVER_ERROR_JSON, status=500, mimetype='application/json')
 
 if __name__ == '__main__':
     logger.info(f"Starting API server on port {API_PORT}")
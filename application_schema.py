@@ -7,6 +7,86 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Indexes backing the leaderboard sort columns and per-user point history, so
+# ORDER BY ... LIMIT walks an index instead of sorting the whole table.
+LEADERBOARD_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_user_points_toss ON user_points (toss_points)',
+    'CREATE INDEX IF NOT EXISTS idx_user_points_winner ON user_points (winner_points)',
+    'CREATE INDEX IF NOT EXISTS idx_user_points_referral ON user_points (referral_points)',
+    'CREATE INDEX IF NOT EXISTS idx_user_point_events_address_timestamp ON user_point_events (address, timestamp)',
+    # Covers the per-referrer referral counts (total and activated) without table lookups
+    'CREATE INDEX IF NOT EXISTS idx_referrals_referrer_activated ON user_referrals (referrer_address, is_activated)'
+]
+
+# Indexes earlier schemas created that duplicate a UNIQUE constraint's index or
+# the leading column of a composite index, or that no query uses; migrations drop them
+REDUNDANT_INDEXES = [
+    'idx_user_points_address',  # UNIQUE(address)
+    'idx_referral_code',  # UNIQUE(referral_code)
+    'idx_referrer_address',  # idx_referrals_referrer_activated
+    'idx_user_point_events_address',  # idx_user_point_events_address_timestamp
+    'idx_user_point_events_type'  # nothing filters user_point_events by event_type
+]
+
+# Triggers keeping calculator_state.user_count equal to the number of
+# user_points rows, so leaderboard totals need no COUNT(*) scan
+USER_COUNT_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_user_points_count_insert AFTER INSERT ON user_points
+    BEGIN
+        UPDATE calculator_state SET user_count = user_count + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_user_points_count_delete AFTER DELETE ON user_points
+    BEGIN
+        UPDATE calculator_state SET user_count = user_count - 1 WHERE id = 1;
+    END
+    '''
+]
+
+# Per-user event totals maintained by the points calculator alongside the points,
+# so the API reads them without aggregating the events database. total_value_spent
+# is the exact wei sum kept as a decimal string, since it overflows 64-bit integers.
+USER_STATS_TABLE = '''
+CREATE TABLE IF NOT EXISTS user_stats (
+    address TEXT PRIMARY KEY,
+    total_tosses INTEGER NOT NULL DEFAULT 0,
+    total_value_spent TEXT NOT NULL DEFAULT '0',
+    total_wins INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# Change counter of the application database, as in events_schema
+DATA_VERSION_TABLE = '''
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# Bump data_version on any change to the points, referral and stats tables, and
+# when the calculator records its progress (user_count changes only with user_points)
+DATA_VERSION_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{action.lower()} AFTER {action} ON {table}
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END
+    '''
+    for table in ('user_points', 'user_point_events', 'user_referrals', 'user_stats')
+    for action in ('INSERT', 'UPDATE', 'DELETE')
+] + [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_calculator_state_version_update
+    AFTER UPDATE OF last_processed_toss_id, last_processed_winner_id,
+        last_processed_timestamp, last_run_timestamp ON calculator_state
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END
+    '''
+]
+
 def setup_application_database(db_path: str):
     """Set up the application database schema from scratch."""
     logger.info(f"Setting up application database at {db_path}")
@@ -18,6 +98,9 @@ def setup_application_database(db_path: str):
     cursor = conn.cursor()
     
     try:
+        # Use write-ahead logging so API readers never block on the writer
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create user_points table
         cursor.execute('''
         CREATE TABLE user_points (
@@ -67,10 +150,14 @@ def setup_application_database(db_path: str):
             last_processed_toss_id INTEGER NOT NULL DEFAULT 0,
             last_processed_winner_id INTEGER NOT NULL DEFAULT 0,
             last_processed_timestamp INTEGER NOT NULL,
-            last_run_timestamp INTEGER NOT NULL
+            last_run_timestamp INTEGER NOT NULL,
+            user_count INTEGER NOT NULL DEFAULT 0
         )
         ''')
         
+        # Create user_stats table
+        cursor.execute(USER_STATS_TABLE)
+        
         # Initialize calculator state
         current_time = int(time.time())
         cursor.execute('''
@@ -80,14 +167,22 @@ def setup_application_database(db_path: str):
         ''', (current_time, current_time))
         
         # Create indices for better query performance
-        cursor.execute('CREATE INDEX idx_user_points_address ON user_points (address)')
+        # Lookups by user_points.address and user_referrals.referral_code use the
+        # indexes behind their UNIQUE constraints; referrer and per-user event
+        # lookups use the composite indexes below
         cursor.execute('CREATE INDEX idx_user_points_total ON user_points (total_points)')
         
-        cursor.execute('CREATE INDEX idx_user_point_events_address ON user_point_events (address)')
-        cursor.execute('CREATE INDEX idx_user_point_events_type ON user_point_events (event_type)')
+        for index_sql in LEADERBOARD_INDEXES:
+            cursor.execute(index_sql)
         
-        cursor.execute('CREATE INDEX idx_referral_code ON user_referrals (referral_code)')
-        cursor.execute('CREATE INDEX idx_referrer_address ON user_referrals (referrer_address)')
+        for trigger_sql in USER_COUNT_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
+        # Create the change counter and the triggers that bump it
+        cursor.execute(DATA_VERSION_TABLE)
+        cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+        for trigger_sql in DATA_VERSION_TRIGGERS:
+            cursor.execute(trigger_sql)
         
         conn.commit()
         logger.info("Application database setup completed successfully")
@@ -96,5 +191,84 @@ def setup_application_database(db_path: str):
         logger.error(f"Error setting up application database: {e}")
         conn.rollback()
         raise
+    finally:
+        conn.close()
+
+def backfill_user_stats(cursor, events_db_path: str):
+    """
+    Rebuild user_stats from the events the calculator has already processed,
+    so later incremental updates continue from the same point.
+    """
+    cursor.execute('SELECT last_processed_toss_id, last_processed_winner_id FROM calculator_state WHERE id = 1')
+    state = cursor.fetchone()
+    last_toss_id, last_winner_id = state if state else (0, 0)
+    
+    events_conn = sqlite3.connect(events_db_path)
+    try:
+        stats = {}
+        for address, amount in events_conn.execute(
+                'SELECT frog_address, amount FROM coin_tossed_events WHERE id <= ?', (last_toss_id,)):
+            tosses, value, wins = stats.get(address.lower(), (0, 0, 0))
+            stats[address.lower()] = (tosses + 1, value + int(amount), wins)
+        for (address,) in events_conn.execute(
+                'SELECT winner_address FROM lucky_winner_selected_events WHERE id <= ?', (last_winner_id,)):
+            tosses, value, wins = stats.get(address.lower(), (0, 0, 0))
+            stats[address.lower()] = (tosses, value, wins + 1)
+    finally:
+        events_conn.close()
+    
+    cursor.execute('DELETE FROM user_stats')
+    cursor.executemany(
+        'INSERT INTO user_stats (address, total_tosses, total_value_spent, total_wins) VALUES (?, ?, ?, ?)',
+        [(address, tosses, str(value), wins) for address, (tosses, value, wins) in stats.items()]
+    )
+    logger.info(f"Backfilled user_stats with {len(stats)} rows")
+
+def migrate_application_database(db_path: str, events_db_path: str):
+    """Bring an existing application database up to date with the current indexes."""
+    logger.info(f"Migrating application database at {db_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        for index_sql in LEADERBOARD_INDEXES:
+            cursor.execute(index_sql)
+        
+        # Drop indexes that only add write cost
+        for index_name in REDUNDANT_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        
+        # Add the user counter to calculator_state and (re)seed it from the table
+        cursor.execute('PRAGMA table_info(calculator_state)')
+        state_columns = {row[1] for row in cursor.fetchall()}
+        if 'user_count' not in state_columns:
+            cursor.execute('ALTER TABLE calculator_state ADD COLUMN user_count INTEGER NOT NULL DEFAULT 0')
+        for trigger_sql in USER_COUNT_TRIGGERS:
+            cursor.execute(trigger_sql)
+        cursor.execute('UPDATE calculator_state SET user_count = (SELECT COUNT(*) FROM user_points) WHERE id = 1')
+        
+        # Create and backfill the user_stats table if it is new or empty
+        cursor.execute(USER_STATS_TABLE)
+        cursor.execute('SELECT COUNT(*) FROM user_stats')
+        if cursor.fetchone()[0] == 0:
+            backfill_user_stats(cursor, events_db_path)
+        
+        # Create the change counter and the triggers that bump it
+        cursor.execute(DATA_VERSION_TABLE)
+        cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+        for trigger_sql in DATA_VERSION_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
+        # Refresh planner statistics so the new indexes get picked up
+        cursor.execute('ANALYZE')
+        
+        conn.commit()
+        logger.info("Application database migration completed successfully")
+        
+    except Exception as e:
+        logger.error(f"Error migrating application database: {e}")
+        conn.rollback()
+        raise
     finally:
         conn.close()
\ No newline at end of file
@@ -1,81 +1,320 @@
 # data_access.py
 
+import os
+import json
+import queue
+import pathlib
+import atexit
 import sqlite3
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Full column list of user_referrals, used instead of SELECT *
+USER_REFERRAL_COLUMNS = 'id, address, referral_code, referrer_address, is_activated, created_at, activated_at'
+
+# Statements behind ApplicationDatabase.add_user_points, built once so every
+# event reuses the same prepared statements from the connection's cache. The
+# upsert creates the user's row or adds to it in one statement; the user_count
+# trigger only fires when the row is new.
+SQL_ADD_USER_POINTS = {
+    event_type: f'''
+INSERT INTO user_points 
+(address, total_points, {event_type}_points, last_updated) 
+VALUES (?, ?, ?, ?)
+ON CONFLICT(address) DO UPDATE SET
+    {event_type}_points = {event_type}_points + excluded.{event_type}_points,
+    total_points = total_points + excluded.total_points,
+    last_updated = excluded.last_updated
+'''
+    for event_type in ('toss', 'winner', 'referral')
+}
+
+SQL_RECORD_POINT_EVENT = '''
+INSERT INTO user_point_events 
+(address, event_type, points, tx_hash, pond_type, timestamp) 
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+SQL_UPDATE_CALCULATOR_STATE = '''
+UPDATE calculator_state 
+SET last_processed_toss_id = ?, 
+    last_processed_winner_id = ?, 
+    last_processed_timestamp = ?,
+    last_run_timestamp = ?
+WHERE id = 1
+'''
+
+# Default number of pooled connections per Database
+DEFAULT_POOL_SIZE = 8
+
+# Per-connection memory tuning, overridable from the environment
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "131072"))  # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "1073741824"))  # bytes of the file mapped into memory
+SQLITE_THREADS = int(os.getenv("SQLITE_THREADS", "4"))  # helper threads SQLite may use for large sorts
+
+# Switches the database file to write-ahead logging; only writable connections
+# can run it, and the mode persists in the file for every reader
+JOURNAL_MODE_PRAGMA = 'PRAGMA journal_mode=WAL'
+
+# Pragmas applied once to every connection a Database opens, shared or not
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+    f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+    f'PRAGMA threads={SQLITE_THREADS}'
+)
+
+def dict_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """Row factory building a plain dict per row, for callers that need dicts anyway"""
+    return dict(zip([column[0] for column in cursor.description], row))
+
+class ConnectionPool:
+    """Bounded pool of long-lived connections shared between threads"""
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int):
+        self._connect = connect
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+    
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        Check out a connection, opening a new one while the pool is below its
+        size and otherwise waiting up to timeout seconds for one to be released.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if len(self._connections) < self.size:
+                conn = self._connect()
+                self._connections.append(conn)
+                return conn
+        
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No pooled connection became free within {timeout}s")
+    
+    def release(self, conn: sqlite3.Connection):
+        """Return a checked-out connection to the pool"""
+        self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and always returns it"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def close_all(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+            self._idle = queue.LifoQueue()
+
 class Database:
     """Base database access class"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, read_only: bool = False, pool_size: int = DEFAULT_POOL_SIZE):
         self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._thread_connections = {}
+        self._lock = threading.Lock()
+        self._pool = ConnectionPool(self.open_shared_connection, pool_size)
+        # (query, params) pairs run on each new shared connection to prime its statement cache
+        self.warm_statements = []
+        atexit.register(self.close_shared_connections)
     
     def get_connection(self):
-        """Get a database connection with row factory enabled"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        Get a database connection with row factory enabled. It gets the same
+        pragmas as the shared connections, so its commits run in WAL mode
+        without a full fsync each.
+        """
+        conn = sqlite3.connect(self.db_path, cached_statements=256)
         conn.row_factory = sqlite3.Row
+        conn.execute(JOURNAL_MODE_PRAGMA)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def open_shared_connection(self):
+        """
+        Open a long-lived connection for the pool or a thread. It is in autocommit
+        mode with the shared pragmas applied, and the warm statements are run once
+        so the hot queries are already prepared; reusing it keeps the page cache
+        and prepared-statement cache warm.
+        """
+        # Read-only databases are opened with SQLITE_OPEN_READONLY, so SQLite
+        # skips the write-side setup and any write fails outright
+        database, uri = self.db_path, False
+        if self.read_only:
+            database, uri = pathlib.Path(self.db_path).resolve().as_uri() + '?mode=ro', True
+        conn = sqlite3.connect(
+            database,
+            uri=uri,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=512
+        )
+        conn.row_factory = sqlite3.Row
+        if not self.read_only:
+            conn.execute(JOURNAL_MODE_PRAGMA)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        for query, params in self.warm_statements:
+            try:
+                conn.execute(query, params).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not warm statement on {self.db_path}: {e}")
+        return conn
+    
+    def acquire_connection(self, timeout: Optional[float] = None):
+        """Check out a pooled connection; it must be handed back with release_connection"""
+        return self._pool.acquire(timeout)
+    
+    def release_connection(self, conn):
+        """Return a connection obtained from acquire_connection to the pool"""
+        self._pool.release(conn)
+    
+    def connection(self):
+        """Context manager yielding a pooled connection for the duration of the block"""
+        return self._pool.connection()
+    
+    def get_thread_connection(self):
+        """
+        Get the calling thread's long-lived connection, opening it on first use.
+        The connection must not be closed by the caller.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = self.open_shared_connection()
+        thread = threading.current_thread()
+        with self._lock:
+            # Close connections left behind by threads that have exited
+            for ident, (owner, stale_conn) in list(self._thread_connections.items()):
+                if not owner.is_alive():
+                    stale_conn.close()
+                    del self._thread_connections[ident]
+            self._thread_connections[thread.ident] = (thread, conn)
+        
+        self._local.conn = conn
         return conn
     
+    def get_data_version(self) -> str:
+        """
+        Version of the database contents: the data_version counter, which
+        triggers bump in every writing transaction. It never repeats, and every
+        process reads the same value, so it can key shared cache entries.
+        """
+        return str(self.execute_scalar('SELECT version FROM data_version WHERE id = 1'))
+    
+    def reset_after_fork(self):
+        """
+        Forget connections inherited from a parent process. SQLite connections
+        must not be used, or closed, across fork(), so the child starts with an
+        empty pool and no per-thread connections.
+        """
+        self._local = threading.local()
+        self._thread_connections = {}
+        self._lock = threading.Lock()
+        self._pool = ConnectionPool(self.open_shared_connection, self._pool.size)
+    
+    def close_shared_connections(self):
+        """Close every pooled and per-thread connection (registered to run at exit)"""
+        self._pool.close_all()
+        with self._lock:
+            for _, conn in self._thread_connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._thread_connections.clear()
+    
     def execute_query(self, query: str, params: Tuple = ()):
         """Execute a query and return all results"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        return self.get_thread_connection().execute(query, params).fetchall()
+    
+    def execute_query_dicts(self, query: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        """Execute a query and return all results as dicts, built directly from the row tuples"""
+        cursor = self.get_thread_connection().cursor()
+        cursor.row_factory = dict_row_factory
+        return cursor.execute(query, params).fetchall()
+    
+    def execute_query_tuples(self, query: str, params: Tuple = ()) -> List[tuple]:
+        """Execute a query and return all results as plain tuples, for callers that unpack rows"""
+        cursor = self.get_thread_connection().cursor()
+        cursor.row_factory = None
+        return cursor.execute(query, params).fetchall()
     
     def execute_scalar(self, query: str, params: Tuple = ()):
         """Execute a query and return a single value"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            return result[0] if result else None
-        finally:
-            conn.close()
+        # fetchall() steps the statement to completion so no read transaction stays open
+        rows = self.get_thread_connection().execute(query, params).fetchall()
+        return rows[0][0] if rows else None
+    
+    def execute_row(self, query: str, params: Tuple = ()):
+        """Execute a query and return its first row, or None"""
+        # As in execute_scalar, fetchall() leaves no statement or read transaction open
+        rows = self.get_thread_connection().execute(query, params).fetchall()
+        return rows[0] if rows else None
     
     def execute_non_query(self, query: str, params: Tuple = ()):
         """Execute a non-query statement (insert, update, delete)"""
-        conn = self.get_connection()
+        # The thread connection is in autocommit mode, so the statement commits on its own
+        return self.get_thread_connection().execute(query, params).rowcount
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager running the block in one transaction on the thread
+        connection, which it yields. Commits when the block ends and rolls
+        back if it raises.
+        """
+        conn = self.get_thread_connection()
+        # Take the write lock up front rather than upgrading mid-transaction
+        conn.execute('BEGIN IMMEDIATE')
         try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
     
     def execute_many(self, query: str, params_list: List[Tuple]):
-        """Execute many statements at once"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
+        """Execute many statements at once, in a single transaction"""
+        with self.transaction() as conn:
+            return conn.executemany(query, params_list).rowcount
     
     def execute_transaction(self, queries_with_params: List[Tuple[str, Tuple]]):
         """Execute multiple statements in a transaction"""
-        conn = self.get_connection()
         try:
-            cursor = conn.cursor()
-            for query, params in queries_with_params:
-                cursor.execute(query, params)
-            conn.commit()
+            with self.transaction() as conn:
+                for query, params in queries_with_params:
+                    conn.execute(query, params)
             return True
         except Exception as e:
-            conn.rollback()
             logger.error(f"Transaction failed: {e}")
             raise
-        finally:
-            conn.close()
 
 class EventsDatabase(Database):
     """Handles access to raw blockchain events database"""
@@ -95,9 +334,12 @@ class EventsDatabase(Database):
             (block_number, current_time)
         )
     
-    def get_unprocessed_toss_events(self, last_id: int, limit: int = 1000) -> List[Dict]:
-        """Get unprocessed coin toss events"""
-        rows = self.execute_query(
+    def get_unprocessed_toss_events(self, last_id: int, limit: int = 1000) -> List[tuple]:
+        """
+        Get unprocessed coin toss events as (id, tx_hash, block_timestamp,
+        pond_type, frog_address, amount, token_address) tuples
+        """
+        return self.execute_query_tuples(
             '''
             SELECT id, tx_hash, block_timestamp, pond_type, frog_address, amount, token_address
             FROM coin_tossed_events
@@ -107,11 +349,13 @@ class EventsDatabase(Database):
             ''',
             (last_id, limit)
         )
-        return [dict(row) for row in rows]
     
-    def get_unprocessed_winner_events(self, last_id: int, limit: int = 1000) -> List[Dict]:
-        """Get unprocessed winner events"""
-        rows = self.execute_query(
+    def get_unprocessed_winner_events(self, last_id: int, limit: int = 1000) -> List[tuple]:
+        """
+        Get unprocessed winner events as (id, tx_hash, block_timestamp,
+        pond_type, winner_address, prize) tuples
+        """
+        return self.execute_query_tuples(
             '''
             SELECT id, tx_hash, block_timestamp, pond_type, winner_address, prize
             FROM lucky_winner_selected_events
@@ -121,26 +365,30 @@ class EventsDatabase(Database):
             ''',
             (last_id, limit)
         )
-        return [dict(row) for row in rows]
 
 class ApplicationDatabase(Database):
     """Handles access to application database (points, referrals, etc.)"""
     
     def get_calculator_state(self) -> Dict[str, int]:
         """Get the current state of the points calculator"""
-        row = self.execute_query(
+        row = self.execute_row(
             '''
             SELECT last_processed_toss_id, last_processed_winner_id, last_processed_timestamp 
             FROM calculator_state 
             WHERE id = 1
             '''
         )
-        if row:
-            return dict(row[0])
+        if row is None:
+            return {
+                "last_processed_toss_id": 0,
+                "last_processed_winner_id": 0,
+                "last_processed_timestamp": 0
+            }
+        toss_id, winner_id, timestamp = row
         return {
-            "last_processed_toss_id": 0,
-            "last_processed_winner_id": 0,
-            "last_processed_timestamp": 0
+            "last_processed_toss_id": toss_id,
+            "last_processed_winner_id": winner_id,
+            "last_processed_timestamp": timestamp
         }
     
     def update_calculator_state(self, toss_id: int, winner_id: int, timestamp: int):
@@ -148,61 +396,123 @@ class ApplicationDatabase(Database):
         import time
         current_time = int(time.time())
         return self.execute_non_query(
-            '''
-            UPDATE calculator_state 
-            SET last_processed_toss_id = ?, 
-                last_processed_winner_id = ?, 
-                last_processed_timestamp = ?,
-                last_run_timestamp = ?
-            WHERE id = 1
-            ''', 
+            SQL_UPDATE_CALCULATOR_STATE,
             (toss_id, winner_id, timestamp, current_time)
         )
     
     def add_user_points(self, address: str, event_type: str, points: int, 
                        tx_hash: str, pond_type: str, timestamp: int):
         """Add points to a user and record the event"""
+        return self.execute_transaction(
+            self.user_points_statements(address, event_type, points, tx_hash, pond_type, timestamp)
+        )
+    
+    def user_points_statements(self, address: str, event_type: str, points: int,
+                               tx_hash: str, pond_type: str, timestamp: int) -> List[Tuple[str, Tuple]]:
+        """
+        Statements adding points to a user and recording the event, for callers
+        that run them inside a larger transaction
+        """
         address = address.lower()
         
-        # Execute as a transaction
-        return self.execute_transaction([
-            # Ensure user exists
-            (
-                '''
-                INSERT OR IGNORE INTO user_points 
-                (address, total_points, toss_points, winner_points, referral_points, last_updated) 
-                VALUES (?, 0, 0, 0, 0, ?)
-                ''',
-                (address, timestamp)
-            ),
-            # Update points based on event type
+        return [
+            # Add points based on event type, creating the user if needed;
+            # unknown types count as referral points
             (
-                '''
-                UPDATE user_points 
-                SET {0}_points = {0}_points + ?, 
-                    total_points = total_points + ?,
-                    last_updated = ?
-                WHERE address = ?
-                '''.format('toss' if event_type == 'toss' else 
-                          'winner' if event_type == 'winner' else 
-                          'referral'),
-                (points, points, timestamp, address)
+                SQL_ADD_USER_POINTS.get(event_type, SQL_ADD_USER_POINTS['referral']),
+                (address, points, points, timestamp)
             ),
             # Record the event
-            (
-                '''
-                INSERT INTO user_point_events 
-                (address, event_type, points, tx_hash, pond_type, timestamp) 
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''',
-                (address, event_type, points, tx_hash, pond_type, timestamp)
+            (SQL_RECORD_POINT_EVENT, (address, event_type, points, tx_hash, pond_type, timestamp))
+        ]
+    
+    def record_calculator_batch(self, awards: List[Tuple[str, str, int, str, str, int]],
+                                increments: Dict[str, Tuple[int, int, int]],
+                                toss_id: int, winner_id: int, timestamp: int):
+        """
+        Apply one calculator batch in a single transaction: the batch's points
+        (see _add_user_points_bulk), its user_stats increments, and the
+        calculator state moved past it. A batch is either recorded whole or
+        not at all, so a failed run is simply retried from the same state.
+        """
+        import time
+        current_time = int(time.time())
+        try:
+            with self.transaction() as conn:
+                self._add_user_points_bulk(conn, awards)
+                self._add_user_stats(conn, increments)
+                conn.execute(SQL_UPDATE_CALCULATOR_STATE, (toss_id, winner_id, timestamp, current_time))
+        except Exception as e:
+            logger.error(f"Recording calculator batch failed: {e}")
+            raise
+    
+    def add_user_stats(self, increments: Dict[str, Tuple[int, int, int]]):
+        """
+        Add (tosses, wei spent, wins) increments per address to user_stats.
+        The wei total is summed in Python and stored as a decimal string.
+        """
+        if not increments:
+            return
+        try:
+            with self.transaction() as conn:
+                self._add_user_stats(conn, increments)
+        except Exception as e:
+            logger.error(f"Updating user stats failed: {e}")
+            raise
+    
+    def _add_user_points_bulk(self, conn, awards: List[Tuple[str, str, int, str, str, int]]):
+        """
+        Add points for a batch of events on conn, inside the caller's
+        transaction. awards holds (address, event_type, points, tx_hash,
+        pond_type, timestamp) tuples in event order; each user's points are
+        summed per type, and last_updated ends at their latest event as with
+        one add_user_points call per event.
+        """
+        last_updated = {}
+        totals = {}
+        event_rows = []
+        for address, event_type, points, tx_hash, pond_type, timestamp in awards:
+            address = address.lower()
+            column_type = event_type if event_type in SQL_ADD_USER_POINTS else 'referral'
+            last_updated[address] = timestamp
+            totals[(column_type, address)] = totals.get((column_type, address), 0) + points
+            event_rows.append((address, event_type, points, tx_hash, pond_type, timestamp))
+        
+        updates = {}
+        for (column_type, address), points in totals.items():
+            updates.setdefault(column_type, []).append((address, points, points, last_updated[address]))
+        
+        for column_type, rows in updates.items():
+            conn.executemany(SQL_ADD_USER_POINTS[column_type], rows)
+        conn.executemany(SQL_RECORD_POINT_EVENT, event_rows)
+    
+    def _add_user_stats(self, conn, increments: Dict[str, Tuple[int, int, int]]):
+        """Add user_stats increments on conn, inside the caller's transaction"""
+        current = {
+            row['address']: row
+            for row in conn.execute(
+                'SELECT address, total_tosses, total_value_spent, total_wins FROM user_stats '
+                'WHERE address IN (SELECT value FROM json_each(?))',
+                (json.dumps(list(increments)),)
             )
-        ])
+        }
+        rows = []
+        for address, (tosses, value, wins) in increments.items():
+            existing = current.get(address)
+            if existing:
+                tosses += existing['total_tosses']
+                value += int(existing['total_value_spent'])
+                wins += existing['total_wins']
+            rows.append((address, tosses, str(value), wins))
+        conn.executemany(
+            'INSERT OR REPLACE INTO user_stats (address, total_tosses, total_value_spent, total_wins) VALUES (?, ?, ?, ?)',
+            rows
+        )
     
     def get_user_referral(self, address: str) -> Optional[Dict]:
         """Get a user's referral information"""
         rows = self.execute_query(
-            'SELECT * FROM user_referrals WHERE address = ?',
+            f'SELECT {USER_REFERRAL_COLUMNS} FROM user_referrals WHERE address = ?',
             (address.lower(),)
         )
         return dict(rows[0]) if rows else None
\ No newline at end of file
@@ -4,8 +4,8 @@ import os
 import sys
 import logging
 from dotenv import load_dotenv
-from events_schema import setup_events_database
-from application_schema import setup_application_database
+from events_schema import setup_events_database, migrate_events_database
+from application_schema import setup_application_database, migrate_application_database
 
 # Configure logging
 logging.basicConfig(
@@ -23,17 +23,27 @@ APP_DB_PATH = os.getenv("APP_DB_PATH", "./data/application.db")
 START_BLOCK = int(os.getenv("START_BLOCK", "0"))
 
 def setup_databases():
-    """Set up both databases from scratch."""
+    """
+    Set up both databases: missing ones are created from scratch and existing
+    ones are migrated in place (new indexes, tables and triggers), so this is
+    safe to run before every start.
+    """
     try:
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(EVENTS_DB_PATH), exist_ok=True)
         os.makedirs(os.path.dirname(APP_DB_PATH), exist_ok=True)
         
-        # Set up events database
-        setup_events_database(EVENTS_DB_PATH, START_BLOCK)
+        # Set up or migrate events database
+        if os.path.exists(EVENTS_DB_PATH):
+            migrate_events_database(EVENTS_DB_PATH)
+        else:
+            setup_events_database(EVENTS_DB_PATH, START_BLOCK)
         
-        # Set up application database
-        setup_application_database(APP_DB_PATH)
+        # Set up or migrate application database
+        if os.path.exists(APP_DB_PATH):
+            migrate_application_database(APP_DB_PATH, EVENTS_DB_PATH)
+        else:
+            setup_application_database(APP_DB_PATH)
         
         logger.info("Database setup completed successfully!")
         return True
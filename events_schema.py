@@ -4,6 +4,80 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Composite indexes for "filter by pond/user/token, newest first" queries. Scanned
+# backwards they yield block_timestamp DESC, id DESC without a temp B-tree.
+COMPOSITE_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_coin_tossed_pond_timestamp ON coin_tossed_events (pond_type, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_coin_tossed_address_timestamp ON coin_tossed_events (frog_address, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_winner_pond_timestamp ON lucky_winner_selected_events (pond_type, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_winner_address_timestamp ON lucky_winner_selected_events (winner_address, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_emergency_pond_timestamp ON emergency_action_events (pond_type, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_coin_tossed_token_timestamp ON coin_tossed_events (token_address, block_timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_winner_token_timestamp ON lucky_winner_selected_events (token_address, block_timestamp)'
+]
+
+# Triggers keeping the indexer_state event counters in step with the event
+# tables, so any writer (indexer, backfills, cleanups) keeps them exact
+EVENT_COUNTER_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_coin_tossed_count_insert AFTER INSERT ON coin_tossed_events
+    BEGIN
+        UPDATE indexer_state SET total_tosses = total_tosses + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_coin_tossed_count_delete AFTER DELETE ON coin_tossed_events
+    BEGIN
+        UPDATE indexer_state SET total_tosses = total_tosses - 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_winner_count_insert AFTER INSERT ON lucky_winner_selected_events
+    BEGIN
+        UPDATE indexer_state SET total_winners = total_winners + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_winner_count_delete AFTER DELETE ON lucky_winner_selected_events
+    BEGIN
+        UPDATE indexer_state SET total_winners = total_winners - 1 WHERE id = 1;
+    END
+    '''
+]
+
+# Single-row change counter, bumped by DATA_VERSION_TRIGGERS in the same
+# transaction as every write. The API keys its response cache and ETags on it,
+# and unlike a per-connection PRAGMA data_version it reads the same in every
+# process.
+DATA_VERSION_TABLE = '''
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# Bump data_version on any change to the event tables, and when the indexer
+# records its progress (the indexer_state counters change only with the events)
+DATA_VERSION_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{action.lower()} AFTER {action} ON {table}
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END
+    '''
+    for table in ('coin_tossed_events', 'lucky_winner_selected_events', 'pond_action_events',
+                  'config_changed_events', 'emergency_action_events')
+    for action in ('INSERT', 'UPDATE', 'DELETE')
+] + [
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_indexer_state_version_update
+    AFTER UPDATE OF last_block, last_updated_timestamp ON indexer_state
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE id = 1;
+    END
+    '''
+]
+
 def setup_events_database(db_path: str, start_block: int = 0):
     """Set up the events database schema from scratch."""
     logger.info(f"Setting up events database at {db_path}")
@@ -15,12 +89,17 @@ def setup_events_database(db_path: str, start_block: int = 0):
     cursor = conn.cursor()
     
     try:
+        # Use write-ahead logging so API readers never block on the writer
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create indexer_state table to track progress
         cursor.execute('''
         CREATE TABLE indexer_state (
             id INTEGER PRIMARY KEY,
             last_block INTEGER NOT NULL,
-            last_updated_timestamp INTEGER NOT NULL
+            last_updated_timestamp INTEGER NOT NULL,
+            total_tosses INTEGER NOT NULL DEFAULT 0,
+            total_winners INTEGER NOT NULL DEFAULT 0
         )
         ''')
         
@@ -126,6 +205,18 @@ def setup_events_database(db_path: str, start_block: int = 0):
         cursor.execute('CREATE INDEX idx_pond_action_pond ON pond_action_events (pond_type)')
         cursor.execute('CREATE INDEX idx_pond_action_timestamp ON pond_action_events (block_timestamp)')
         
+        for index_sql in COMPOSITE_INDEXES:
+            cursor.execute(index_sql)
+        
+        for trigger_sql in EVENT_COUNTER_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
+        # Create the change counter and the triggers that bump it
+        cursor.execute(DATA_VERSION_TABLE)
+        cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+        for trigger_sql in DATA_VERSION_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
         conn.commit()
         logger.info("Events database setup completed successfully")
         
@@ -133,5 +224,55 @@ def setup_events_database(db_path: str, start_block: int = 0):
         logger.error(f"Error setting up events database: {e}")
         conn.rollback()
         raise
+    finally:
+        conn.close()
+
+def migrate_events_database(db_path: str):
+    """Bring an existing events database up to date with the current indexes."""
+    logger.info(f"Migrating events database at {db_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        for index_sql in COMPOSITE_INDEXES:
+            cursor.execute(index_sql)
+        
+        # Add event counters to indexer_state, seeded from the existing rows
+        cursor.execute('PRAGMA table_info(indexer_state)')
+        state_columns = {row[1] for row in cursor.fetchall()}
+        if 'total_tosses' not in state_columns:
+            cursor.execute('ALTER TABLE indexer_state ADD COLUMN total_tosses INTEGER NOT NULL DEFAULT 0')
+            cursor.execute('ALTER TABLE indexer_state ADD COLUMN total_winners INTEGER NOT NULL DEFAULT 0')
+        
+        # Install the counter triggers, reseeding the counters when they are new
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_coin_tossed_count_insert'")
+        triggers_exist = cursor.fetchone()[0] > 0
+        for trigger_sql in EVENT_COUNTER_TRIGGERS:
+            cursor.execute(trigger_sql)
+        if not triggers_exist:
+            cursor.execute('''
+            UPDATE indexer_state SET
+                total_tosses = (SELECT COUNT(*) FROM coin_tossed_events),
+                total_winners = (SELECT COUNT(*) FROM lucky_winner_selected_events)
+            WHERE id = 1
+            ''')
+        
+        # Create the change counter and the triggers that bump it
+        cursor.execute(DATA_VERSION_TABLE)
+        cursor.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+        for trigger_sql in DATA_VERSION_TRIGGERS:
+            cursor.execute(trigger_sql)
+        
+        # Refresh planner statistics so the new indexes get picked up
+        cursor.execute('ANALYZE')
+        
+        conn.commit()
+        logger.info("Events database migration completed successfully")
+        
+    except Exception as e:
+        logger.error(f"Error migrating events database: {e}")
+        conn.rollback()
+        raise
     finally:
         conn.close()
\ No newline at end of file
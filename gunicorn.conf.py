@@ -0,0 +1,28 @@
+# gunicorn.conf.py
+
+import os
+
+# Bind address inside the container (docker-compose maps API_PORT to 5000)
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Threaded workers: each thread keeps its own SQLite connection, and WAL lets
+# readers run in parallel, so a slow request no longer blocks /health
+worker_class = "gthread"
+workers = int(os.getenv("API_WORKERS", str(os.cpu_count() or 2)))
+threads = int(os.getenv("API_THREADS", "8"))
+
+timeout = 120
+
+# Keep client connections open between requests (behind a reverse proxy)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Import the app once in the master so workers fork with the module, its SQL
+# constants and the response cache already built
+preload_app = True
+
+def post_fork(server, worker):
+    """Give each worker its own database connections instead of the master's."""
+    import app
+    app.events_db.reset_after_fork()
+    app.app_db.reset_after_fork()
+    app.referral_system.app_db.reset_after_fork()
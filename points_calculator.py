@@ -37,7 +37,7 @@ class PointsCalculator:
             events_db_path: Path to the events database
         """
         self.app_db = ApplicationDatabase(app_db_path)
-        self.events_db = EventsDatabase(events_db_path)
+        self.events_db = EventsDatabase(events_db_path, read_only=True)
         self.token_config = TokenConfig()
         self.ensure_calculator_state()
         
@@ -88,17 +88,11 @@ class PointsCalculator:
         
         processed_count = 0
         max_id = last_id
+        awards = []
+        stats = {}
         
         # Process each event
-        for event in toss_events:
-            event_id = event['id']
-            tx_hash = event['tx_hash']
-            block_timestamp = event['block_timestamp']
-            pond_type = event['pond_type']
-            address = event['frog_address']
-            amount = event['amount']
-            token_address = event.get('token_address', '0x0000000000000000000000000000000000000000')
-            
+        for event_id, tx_hash, block_timestamp, pond_type, address, amount, token_address in toss_events:
             # Calculate points using token-aware calculation
             toss_points = self.token_config.calculate_points(
                 amount=amount,
@@ -107,22 +101,28 @@ class PointsCalculator:
                 multiplier=TOSS_POINTS_MULTIPLIER
             )
             
-            # Award toss points
-            self.add_user_points(address, 'toss', toss_points, tx_hash, pond_type, block_timestamp)
+            # Queue the toss points, awarded for the whole batch at once
+            awards.append((address, 'toss', toss_points, tx_hash, pond_type, block_timestamp))
             
             # Check and activate referrals
             self.check_and_activate_referral(address, block_timestamp)
             
+            # Accumulate the user's toss count and value spent
+            tosses, value, wins = stats.get(address.lower(), (0, 0, 0))
+            stats[address.lower()] = (tosses + 1, value + int(amount), wins)
+            
             processed_count += 1
             max_id = max(max_id, event_id)
         
-        # Update the calculator state with the last processed ID
-        if max_id > last_id:
-            self.app_db.update_calculator_state(
-                max_id,
-                state.get("last_processed_winner_id", 0),
-                get_current_timestamp()
-            )
+        # Award the batch's points, update the per-user event totals and move
+        # the calculator state to the last processed ID, all in one transaction
+        self.app_db.record_calculator_batch(
+            awards,
+            stats,
+            max_id,
+            state.get("last_processed_winner_id", 0),
+            get_current_timestamp()
+        )
         
         logger.info(f"Processed {processed_count} coin toss events")
         return processed_count
@@ -150,28 +150,30 @@ class PointsCalculator:
         
         processed_count = 0
         max_id = last_id
+        awards = []
+        stats = {}
         
         # Process each event
-        for event in winner_events:
-            event_id = event['id']
-            tx_hash = event['tx_hash']
-            block_timestamp = event['block_timestamp']
-            pond_type = event['pond_type']
-            address = event['winner_address']
+        for event_id, tx_hash, block_timestamp, pond_type, address, _prize in winner_events:
+            # Queue the fixed points for winning, awarded for the whole batch at once
+            awards.append((address, 'winner', WIN_POINTS, tx_hash, pond_type, block_timestamp))
             
-            # Award fixed points for winning
-            self.add_user_points(address, 'winner', WIN_POINTS, tx_hash, pond_type, block_timestamp)
+            # Accumulate the user's win count
+            tosses, value, wins = stats.get(address.lower(), (0, 0, 0))
+            stats[address.lower()] = (tosses, value, wins + 1)
             
             processed_count += 1
             max_id = max(max_id, event_id)
         
-        # Update the calculator state with the last processed ID
-        if max_id > last_id:
-            self.app_db.update_calculator_state(
-                state.get("last_processed_toss_id", 0),
-                max_id,
-                get_current_timestamp()
-            )
+        # Award the batch's points, update the per-user event totals and move
+        # the calculator state to the last processed ID, all in one transaction
+        self.app_db.record_calculator_batch(
+            awards,
+            stats,
+            state.get("last_processed_toss_id", 0),
+            max_id,
+            get_current_timestamp()
+        )
         
         logger.info(f"Processed {processed_count} winner events")
         return processed_count
@@ -189,65 +191,49 @@ class PointsCalculator:
         """
         user_address = user_address.lower()
         
-        # Get a direct database connection for this operation
-        conn = self.app_db.get_connection()
-        cursor = conn.cursor()
-        
         try:
             # Check if user has a referrer and hasn't been activated yet
-            cursor.execute('''
+            rows = self.app_db.execute_query('''
             SELECT ur.referrer_address, ur.is_activated 
             FROM user_referrals ur
             WHERE ur.address = ? AND ur.referrer_address IS NOT NULL
             ''', (user_address,))
             
-            result = cursor.fetchone()
-            
             # If no referral or already activated, nothing to do
-            if not result or result['is_activated'] == 1:
-                conn.close()
+            if not rows or rows[0]['is_activated'] == 1:
                 return False
             
-            referrer_address = result['referrer_address']
+            referrer_address = rows[0]['referrer_address']
+        except Exception as e:
+            logger.error(f"Error checking referral for {user_address}: {e}")
+            return False
+        
+        try:
+            # Activate the referral and award the referrer's bonus in one
+            # transaction on the thread's shared connection
+            self.app_db.execute_transaction([
+                (
+                    '''
+                    UPDATE user_referrals 
+                    SET is_activated = 1, activated_at = ? 
+                    WHERE address = ?
+                    ''',
+                    (timestamp, user_address)
+                )
+            ] + self.app_db.user_points_statements(
+                referrer_address, 
+                'referral', 
+                REFERRAL_BONUS_POINTS, 
+                'activation_' + user_address,  # Use a unique identifier
+                'referral',  # pond_type
+                timestamp
+            ))
             
-            # Begin transaction
-            conn.execute('BEGIN TRANSACTION')
+            logger.info(f"Activated referral: {user_address} referred by {referrer_address}")
+            return True
             
-            try:
-                # Activate the referral
-                cursor.execute('''
-                UPDATE user_referrals 
-                SET is_activated = 1, activated_at = ? 
-                WHERE address = ?
-                ''', (timestamp, user_address))
-                
-                # Award referral bonus points to the referrer
-                self.add_user_points(
-                    referrer_address, 
-                    'referral', 
-                    REFERRAL_BONUS_POINTS, 
-                    'activation_' + user_address,  # Use a unique identifier
-                    'referral',  # pond_type
-                    timestamp
-                )
-                
-                # Commit the transaction
-                conn.commit()
-                conn.close()
-                
-                logger.info(f"Activated referral: {user_address} referred by {referrer_address}")
-                return True
-                
-            except Exception as e:
-                conn.rollback()
-                conn.close()
-                logger.error(f"Error activating referral for {user_address}: {e}")
-                return False
-                
         except Exception as e:
-            if conn:
-                conn.close()
-            logger.error(f"Error checking referral for {user_address}: {e}")
+            logger.error(f"Error activating referral for {user_address}: {e}")
             return False
     
     def generate_referral_code(self, length: int = 8) -> str:
@@ -264,20 +250,16 @@ class PointsCalculator:
         import string
         
         characters = string.ascii_uppercase + string.digits
-        conn = self.app_db.get_connection()
-        cursor = conn.cursor()
         
         while True:
             # Generate a random code
             code = ''.join(random.choices(characters, k=length))
             
             # Check if the code already exists
-            cursor.execute('SELECT COUNT(*) FROM user_referrals WHERE referral_code = ?', (code,))
-            count = cursor.fetchone()[0]
+            count = self.app_db.execute_scalar('SELECT COUNT(*) FROM user_referrals WHERE referral_code = ?', (code,))
             
             # If code doesn't exist, return it
             if count == 0:
-                conn.close()
                 return code
     
     def create_user_referral(self, address: str) -> Dict[str, Any]:
@@ -291,37 +273,25 @@ class PointsCalculator:
             Dictionary with user referral information
         """
         address = address.lower()
-        conn = self.app_db.get_connection()
-        cursor = conn.cursor()
         
         # Check if user already has a referral code
-        cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
-        user_referral = cursor.fetchone()
-        
+        user_referral = self.app_db.get_user_referral(address)
         if user_referral:
-            result = dict(zip([column[0] for column in cursor.description], user_referral))
-            conn.close()
-            return result
+            return user_referral
         
         # Create a new referral code
         referral_code = self.generate_referral_code()
         current_time = get_current_timestamp()
         
-        # Insert new record
-        cursor.execute('''
+        # Insert new record; the thread connection commits it straight away
+        self.app_db.execute_non_query('''
         INSERT INTO user_referrals 
         (address, referral_code, created_at, is_activated) 
         VALUES (?, ?, ?, 0)
         ''', (address, referral_code, current_time))
-        conn.commit()
         
         # Get the newly created record
-        cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
-        user_referral = cursor.fetchone()
-        result = dict(zip([column[0] for column in cursor.description], user_referral))
-        
-        conn.close()
-        return result
+        return self.app_db.get_user_referral(address)
     
     def apply_referral_code(self, user_address: str, referral_code: str) -> Tuple[bool, str]:
         """
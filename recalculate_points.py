@@ -53,6 +53,10 @@ def reset_points_data():
         cursor.execute('DELETE FROM user_point_events')
         logger.info("Deleted all records from user_point_events table")
         
+        # Delete all per-user event totals
+        cursor.execute('DELETE FROM user_stats')
+        logger.info("Deleted all records from user_stats table")
+        
         # Reset calculator state
         cursor.execute('''
         UPDATE calculator_state 
@@ -94,8 +98,7 @@ def process_toss_events(batch_size=1000):
     total_events = cursor.fetchone()[0]
     logger.info(f"Found {total_events} coin toss events to process")
     
-    # Process in batches
-    offset = 0
+    # Process in batches, each starting after the last id processed
     processed_count = 0
     last_processed_id = 0
     
@@ -106,9 +109,10 @@ def process_toss_events(batch_size=1000):
             cursor.execute('''
             SELECT id, tx_hash, block_timestamp, pond_type, frog_address, amount, token_address
             FROM coin_tossed_events
+            WHERE id > ?
             ORDER BY id ASC
-            LIMIT ? OFFSET ?
-            ''', (batch_size, offset))
+            LIMIT ?
+            ''', (last_processed_id, batch_size))
             
             events = cursor.fetchall()
             if not events:
@@ -116,15 +120,10 @@ def process_toss_events(batch_size=1000):
             
             app_conn.execute('BEGIN TRANSACTION')
             app_cursor = app_conn.cursor()
+            stats = {}
             
-            for event in events:
-                event_id = event['id']
-                tx_hash = event['tx_hash']
-                block_timestamp = event['block_timestamp']
-                pond_type = event['pond_type']
-                address = event['frog_address'].lower()
-                amount = event['amount']
-                token_address = event.get('token_address', '0x0000000000000000000000000000000000000000')
+            for event_id, tx_hash, block_timestamp, pond_type, address, amount, token_address in events:
+                address = address.lower()
                 
                 # Calculate points using token-aware calculation
                 toss_points = token_config.calculate_points(
@@ -157,6 +156,10 @@ def process_toss_events(batch_size=1000):
                 VALUES (?, 'toss', ?, ?, ?, ?)
                 ''', (address, toss_points, tx_hash, pond_type, block_timestamp))
                 
+                # Accumulate the user's toss count and value spent
+                tosses, value, wins = stats.get(address, (0, 0, 0))
+                stats[address] = (tosses + 1, value + int(amount), wins)
+                
                 processed_count += 1
                 last_processed_id = max(last_processed_id, event_id)
                 
@@ -165,7 +168,7 @@ def process_toss_events(batch_size=1000):
                     logger.info(f"Processed {processed_count}/{total_events} toss events ({processed_count/total_events*100:.1f}%)")
             
             app_conn.commit()
-            offset += batch_size
+            app_db.add_user_stats(stats)
     
     except Exception as e:
         if app_conn:
@@ -196,8 +199,7 @@ def process_winner_events(batch_size=1000):
     total_events = cursor.fetchone()[0]
     logger.info(f"Found {total_events} winner events to process")
     
-    # Process in batches
-    offset = 0
+    # Process in batches, each starting after the last id processed
     processed_count = 0
     last_processed_id = 0
     
@@ -208,9 +210,10 @@ def process_winner_events(batch_size=1000):
             cursor.execute('''
             SELECT id, tx_hash, block_timestamp, pond_type, winner_address, prize
             FROM lucky_winner_selected_events
+            WHERE id > ?
             ORDER BY id ASC
-            LIMIT ? OFFSET ?
-            ''', (batch_size, offset))
+            LIMIT ?
+            ''', (last_processed_id, batch_size))
             
             events = cursor.fetchall()
             if not events:
@@ -218,13 +221,10 @@ def process_winner_events(batch_size=1000):
             
             app_conn.execute('BEGIN TRANSACTION')
             app_cursor = app_conn.cursor()
+            stats = {}
             
-            for event in events:
-                event_id = event['id']
-                tx_hash = event['tx_hash']
-                block_timestamp = event['block_timestamp']
-                pond_type = event['pond_type']
-                address = event['winner_address'].lower()
+            for event_id, tx_hash, block_timestamp, pond_type, address, _prize in events:
+                address = address.lower()
                 
                 # Ensure user exists in points table
                 app_cursor.execute('''
@@ -249,6 +249,10 @@ def process_winner_events(batch_size=1000):
                 VALUES (?, 'winner', ?, ?, ?, ?)
                 ''', (address, WIN_POINTS, tx_hash, pond_type, block_timestamp))
                 
+                # Accumulate the user's win count
+                tosses, value, wins = stats.get(address, (0, 0, 0))
+                stats[address] = (tosses, value, wins + 1)
+                
                 processed_count += 1
                 last_processed_id = max(last_processed_id, event_id)
                 
@@ -257,7 +261,7 @@ def process_winner_events(batch_size=1000):
                     logger.info(f"Processed {processed_count}/{total_events} winner events ({processed_count/total_events*100:.1f}%)")
             
             app_conn.commit()
-            offset += batch_size
+            app_db.add_user_stats(stats)
     
     except Exception as e:
         if app_conn:
@@ -5,7 +5,7 @@ from typing import Dict, Any, List, Tuple
 from dotenv import load_dotenv
 
 # Import our database access layer and utilities
-from data_access import ApplicationDatabase
+from data_access import ApplicationDatabase, USER_REFERRAL_COLUMNS
 from utils import (
     get_app_db_path,
     get_referral_bonus_points,
@@ -39,12 +39,14 @@ class ReferralSystem:
         """
         self.app_db = ApplicationDatabase(app_db_path)
     
-    def generate_referral_code(self, length: int = 8) -> str:
+    def generate_referral_code(self, length: int = 8, cursor=None) -> str:
         """
         Generate a unique referral code.
         
         Args:
             length: Length of the referral code
+            cursor: Cursor of a connection the caller already holds (optional);
+                    a connection is opened only when none is given
             
         Returns:
             Unique referral code string
@@ -53,21 +55,26 @@ class ReferralSystem:
         secure_random = random.SystemRandom()
         characters = string.ascii_uppercase + string.digits
         
-        conn = self.app_db.get_connection()
-        cursor = conn.cursor()
+        conn = None
+        if cursor is None:
+            conn = self.app_db.get_connection()
+            cursor = conn.cursor()
         
-        while True:
-            # Generate a random code
-            code = ''.join(secure_random.choice(characters) for _ in range(length))
-            
-            # Check if the code already exists
-            cursor.execute('SELECT COUNT(*) FROM user_referrals WHERE referral_code = ?', (code,))
-            count = cursor.fetchone()[0]
-            
-            # If code doesn't exist, return it
-            if count == 0:
+        try:
+            while True:
+                # Generate a random code
+                code = ''.join(secure_random.choice(characters) for _ in range(length))
+                
+                # Check if the code already exists
+                cursor.execute('SELECT COUNT(*) FROM user_referrals WHERE referral_code = ?', (code,))
+                count = cursor.fetchone()[0]
+                
+                # If code doesn't exist, return it
+                if count == 0:
+                    return code
+        finally:
+            if conn is not None:
                 conn.close()
-                return code
     
     def get_or_create_user_referral(self, address: str) -> Dict[str, Any]:
         """
@@ -85,39 +92,35 @@ class ReferralSystem:
         
         try:
             # Check if user already has a referral code
-            cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
+            cursor.execute(f'SELECT {USER_REFERRAL_COLUMNS} FROM user_referrals WHERE address = ?', (address,))
             user_referral = cursor.fetchone()
             
             if user_referral:
                 # Convert row to dictionary
-                result = dict(user_referral)
-            else:
-                # Create a new referral code
-                referral_code = self.generate_referral_code()
-                current_time = get_current_timestamp()
-                
-                # Insert new record
-                cursor.execute('''
-                INSERT INTO user_referrals 
-                (address, referral_code, created_at, is_activated) 
-                VALUES (?, ?, ?, 0)
-                ''', (address, referral_code, current_time))
-                conn.commit()
-                
-                # Get the newly created record
-                cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
-                user_referral = cursor.fetchone()
-                result = dict(user_referral)
+                return dict(user_referral)
             
-            conn.close()
-            return result
+            # Create a new referral code, checked for uniqueness on this same connection
+            referral_code = self.generate_referral_code(cursor=cursor)
+            current_time = get_current_timestamp()
+            
+            # Insert new record
+            cursor.execute('''
+            INSERT INTO user_referrals 
+            (address, referral_code, created_at, is_activated) 
+            VALUES (?, ?, ?, 0)
+            ''', (address, referral_code, current_time))
+            conn.commit()
+            
+            # Get the newly created record
+            cursor.execute(f'SELECT {USER_REFERRAL_COLUMNS} FROM user_referrals WHERE address = ?', (address,))
+            return dict(cursor.fetchone())
             
         except Exception as e:
-            if conn in locals():
-                conn.rollback()
-                conn.close()
+            conn.rollback()
             logger.error(f"Error in get_or_create_user_referral: {e}")
             raise
+        finally:
+            conn.close()
     
     def apply_referral_code(self, user_address: str, referral_code: str) -> Tuple[bool, str]:
         """
@@ -137,17 +140,9 @@ class ReferralSystem:
         cursor = conn.cursor()
         
         try:
-            # Begin transaction
-            conn.execute('BEGIN TRANSACTION')
-            
-            # Check if user already has a referrer
-            cursor.execute('SELECT referrer_address FROM user_referrals WHERE address = ?', (user_address,))
-            result = cursor.fetchone()
-            
-            if result and result['referrer_address']:
-                conn.rollback()
-                conn.close()
-                return False, "User already has a referrer"
+            # Take the write lock up front, so the reads below cannot go stale
+            # before the write and the transaction never has to be retried
+            conn.execute('BEGIN IMMEDIATE')
             
             # Find the referrer by code
             cursor.execute('SELECT address FROM user_referrals WHERE referral_code = ?', (referral_code,))
@@ -155,7 +150,6 @@ class ReferralSystem:
             
             if not referrer_result:
                 conn.rollback()
-                conn.close()
                 return False, "Invalid referral code"
             
             referrer_address = referrer_result['address']
@@ -163,41 +157,44 @@ class ReferralSystem:
             # Make sure user isn't trying to refer themselves
             if user_address == referrer_address:
                 conn.rollback()
-                conn.close()
                 return False, "Cannot refer yourself"
             
-            # Create user referral record if it doesn't exist
-            cursor.execute('SELECT COUNT(*) FROM user_referrals WHERE address = ?', (user_address,))
-            if cursor.fetchone()[0] == 0:
-                # Generate a referral code for the user
-                new_code = self.generate_referral_code()
-                current_time = get_current_timestamp()
-                
-                cursor.execute('''
-                INSERT INTO user_referrals 
-                (address, referral_code, created_at, is_activated) 
-                VALUES (?, ?, ?, 0)
-                ''', (user_address, new_code, current_time))
-            
-            # Update user's referrer
+            # Set the referrer only if none is set yet; the condition makes the
+            # check and the update a single atomic statement
             cursor.execute('''
             UPDATE user_referrals 
             SET referrer_address = ? 
-            WHERE address = ?
+            WHERE address = ? AND referrer_address IS NULL
             ''', (referrer_address, user_address))
             
+            if cursor.rowcount == 0:
+                # No row was updated: either the user has no record yet, or
+                # already has a referrer (then the insert is ignored)
+                new_code = self.generate_referral_code(cursor=cursor)
+                current_time = get_current_timestamp()
+                
+                cursor.execute('''
+                INSERT INTO user_referrals 
+                (address, referral_code, referrer_address, created_at, is_activated) 
+                VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT(address) DO NOTHING
+                ''', (user_address, new_code, referrer_address, current_time))
+                
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return False, "User already has a referrer"
+            
             # Commit the transaction
             conn.commit()
-            conn.close()
             
             return True, "Referral code applied successfully"
         
         except Exception as e:
-            if conn in locals():
-                conn.rollback()
-                conn.close()
+            conn.rollback()
             logger.error(f"Error applying referral code: {e}")
             return False, f"Error: {str(e)}"
+        finally:
+            conn.close()
     
     def check_and_activate_referral(self, user_address: str) -> bool:
         """
@@ -333,24 +330,22 @@ class ReferralSystem:
         
         try:
             # Get points info
-            cursor.execute('SELECT * FROM user_points WHERE address = ?', (address,))
+            cursor.execute('SELECT total_points FROM user_points WHERE address = ?', (address,))
             points_data = cursor.fetchone()
             if points_data:
                 result["total_points"] = points_data["total_points"]
             
-            # Get referral info
-            cursor.execute('SELECT * FROM user_referrals WHERE address = ?', (address,))
+            # Get referral info, with the referrer's code through a self-join
+            cursor.execute('''
+            SELECT ur.referral_code, referrer.referral_code as referrer_code
+            FROM user_referrals ur
+            LEFT JOIN user_referrals referrer ON referrer.address = ur.referrer_address
+            WHERE ur.address = ?
+            ''', (address,))
             referral_data = cursor.fetchone()
             if referral_data:
                 result["referral_code"] = referral_data["referral_code"]
-                
-                # If this user has a referrer, get that referrer's code
-                if referral_data["referrer_address"]:
-                    cursor.execute('SELECT referral_code FROM user_referrals WHERE address = ?', 
-                                  (referral_data["referrer_address"],))
-                    referrer_code = cursor.fetchone()
-                    if referrer_code:
-                        result["referrer_code_used"] = referrer_code["referral_code"]
+                result["referrer_code_used"] = referral_data["referrer_code"]
             
             # Count referrals (total and activated)
             cursor.execute('''
@@ -0,0 +1,122 @@
+# response_cache.py
+
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cached value: (body, mimetype)
+CachedResponse = Tuple[bytes, str]
+
+# Seconds a stale copy is kept in Redis. Bounds the keyspace, since every
+# distinct path and query string gets its own stale key.
+STALE_TTL = 24 * 60 * 60
+
+class ResponseCache:
+    """
+    Cache of rendered API responses.
+    Entries live in an in-process LRU and, when a Redis URL is configured, in
+    Redis as well so every worker process shares them. A separate "stale"
+    copy of the last good response per path is kept past its ttl, to be
+    served if the database is failing: in the LRU until evicted, and in
+    Redis for STALE_TTL seconds.
+    """
+
+    def __init__(self, max_entries: int, redis_url: Optional[str] = None, key_prefix: str = 'luckyponds'):
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._stale = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = self._connect_redis(redis_url) if redis_url else None
+
+    def _connect_redis(self, redis_url: str):
+        """Create a Redis client, or return None if the redis package is missing"""
+        try:
+            import redis
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed; using in-process cache only")
+            return None
+        logger.info("Using Redis for shared response caching")
+        return redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def _redis_key(self, kind: str, key: str) -> str:
+        return f"{self.key_prefix}:{kind}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+    @staticmethod
+    def _encode(value: CachedResponse) -> bytes:
+        body, mimetype = value
+        return mimetype.encode() + b'\n' + body
+
+    @staticmethod
+    def _decode(raw: bytes) -> CachedResponse:
+        mimetype, _, body = raw.partition(b'\n')
+        return body, mimetype.decode()
+
+    def _remember(self, store: OrderedDict, key: str, entry):
+        """Insert into an in-process LRU, evicting the oldest entry when full"""
+        with self._lock:
+            store[key] = entry
+            store.move_to_end(key)
+            if len(store) > self.max_entries:
+                store.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a fresh cached response, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(self._redis_key('resp', key))
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {e}")
+                return None
+            if raw is not None:
+                return self._decode(raw)
+        return None
+
+    def set(self, key: str, value: CachedResponse, ttl: int):
+        """Store a response for ttl seconds"""
+        self._remember(self._entries, key, (time.monotonic() + ttl, value))
+        if self._redis is not None:
+            try:
+                self._redis.setex(self._redis_key('resp', key), ttl, self._encode(value))
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {e}")
+
+    def get_stale(self, path: str) -> Optional[CachedResponse]:
+        """Get the last good response for a path, however old, or None"""
+        with self._lock:
+            value = self._stale.get(path)
+        if value is not None:
+            return value
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(self._redis_key('stale', path))
+            except Exception as e:
+                logger.warning(f"Redis stale read failed: {e}")
+                return None
+            if raw is not None:
+                return self._decode(raw)
+        return None
+
+    def set_stale(self, path: str, value: CachedResponse):
+        """Remember the last good response for a path, for STALE_TTL seconds in Redis"""
+        self._remember(self._stale, path, value)
+        if self._redis is not None:
+            try:
+                self._redis.setex(self._redis_key('stale', path), STALE_TTL, self._encode(value))
+            except Exception as e:
+                logger.warning(f"Redis stale write failed: {e}")